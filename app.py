@@ -1,13 +1,25 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, session
+import os
 import random
 import datetime
 from geopy.distance import geodesic
 from flask_cors import CORS
 
 from optimizer.optimizer_core import optimize_route as ai_optimize_route  # ✅ AI-based optimization
-from optimizer.graph_utils import graph
+from optimizer.optimizer_core import optimize_routes as ai_optimize_routes
+from optimizer.route_cache import route_cache
+from optimizer.compiled_graph import get_compiled_graph
+from optimizer.traffic_snapshot import start_background_refresh
+from optimizer.weather_grid import weather_grid, PointWeatherProvider, start_background_refresh as start_weather_refresh
+from optimizer.graph_utils import coordinates
 from optimizer.factors import weather_factor, traffic_factor, cargo_factor  # Factor adjustments
-from traffic_api import get_live_traffic_factor  # Optional: real-time traffic integration
+from optimizer.traffic_api import get_live_traffic_factor  # Optional: real-time traffic integration
+from optimizer.http_client import provider_metrics
+from optimizer.weather_cache import WeatherCache
+from optimizer.dynamic_graph import close_edge, reopen_edge, reweight_edge, edge_changes
+from optimizer.graph_registry import load_graph, graph_info
+from optimizer.reachability import reachable_cities
+from optimizer.multi_stop import plan_stops
 
 # Keep get_current_weather function inside app.py or import it if external
 
@@ -18,9 +30,19 @@ app = Flask(__name__)
 app.secret_key = 'your_secret_key'
 CORS(app)  # Let Squarespace JS talk to your backend
 
+# 🚦 Traffic for every road edge, refreshed in the background by one process
+# (live Directions API calls only with LIVE_TRAFFIC=1); searches read the snapshot
+start_background_refresh(get_compiled_graph)
+
 # Development mode flag
 DEV_MODE = True
 
+# Graph files that /api/graph may load (.json, .csv or .npz)
+GRAPH_DIR = os.environ.get("GRAPH_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "graphs"))
+
+# Upper bound on the 'k' alternatives a single /ai_optimize_route call may ask for
+MAX_ALTERNATIVE_ROUTES = 10
+
 # --- In-memory data ---
 ports = {
     'New York': (40.7128, -74.0060),
@@ -53,7 +75,6 @@ ports = {
     'Lagos': (6.5244, 3.3792)
 }
 
-
 shipments = []
 shipment_id_counter = 1
 latest_route = []  # 🔁 This will store the latest optimized route for map display
@@ -61,7 +82,7 @@ latest_route = []  # 🔁 This will store the latest optimized route for map dis
 
 # --- Helper functions ---
 
-def get_current_weather(lat, lng):
+def fetch_current_weather(lat, lng):
     fake_conditions = [
         "Clear skies", "Partly cloudy", "Overcast", "Light rain",
         "Heavy rain", "Stormy", "Foggy", "Windy", "Snowy"
@@ -70,6 +91,44 @@ def get_current_weather(lat, lng):
     temperature = round(random.uniform(15, 35), 1)
     return {"location": f"Lat {lat:.2f}, Lon {lng:.2f}", "temperature": f"{temperature}°C", "condition": condition}
 
+# Cached by rounded coordinates; concurrent misses share one upstream call
+weather_cache = WeatherCache(fetch_current_weather)
+
+def get_current_weather(lat, lng):
+    return weather_cache.get(lat, lng)
+
+# 🌦️ One weather report per geohash cell around the ports and road nodes,
+# refreshed in a single background batch instead of per request
+weather_grid.register(list(ports.values()) + list(coordinates.values()))
+start_weather_refresh(PointWeatherProvider(fetch_current_weather))
+
+def weather_for(coords):
+    """Grid weather for a point, or a direct lookup before the first grid refresh."""
+    return weather_grid.weather_at(*coords) or get_current_weather(*coords)
+
+def grid_node_weather(weather, enabled=True):
+    """
+    Grid weather per road node for a query whose endpoints see `weather`, or
+    None when it is disabled, not fetched yet, or the same on every node, so
+    the query can run on uniform weather ('ch' and 'table' need that).
+    """
+    if not enabled:
+        return None
+    node_weather = weather_grid.node_weather(get_compiled_graph())
+    if node_weather is None or not node_weather.differs_from(weather):
+        return None
+    return node_weather
+
+# Higher means rougher; the worst condition at either end is used for routing
+CONDITION_PRIORITY = {
+    "Clear skies": 1, "Partly cloudy": 2, "Overcast": 3,
+    "Light rain": 4, "Foggy": 4, "Windy": 5,
+    "Heavy rain": 6, "Stormy": 7, "Snowy": 8
+}
+
+def worst_condition(*conditions):
+    return max(conditions, key=lambda x: CONDITION_PRIORITY.get(x, 0))
+
 def calculate_distance(origin_coords, destination_coords):
     return geodesic(origin_coords, destination_coords).kilometers
 
@@ -81,9 +140,11 @@ def calculate_cost(distance, weight, shipping_class):
         multiplier = 2
     return distance * 2 * weight * multiplier
 
+# Distance covered per hour by shipping class, in km/h
+SHIPPING_SPEEDS = {'standard': 30, 'express': 45, 'heavy_cargo': 20}
+
 def calculate_eta(distance, shipping_class):
-    speeds = {'standard': 30, 'express': 45, 'heavy_cargo': 20}
-    return distance / speeds[shipping_class]
+    return distance / SHIPPING_SPEEDS[shipping_class]
 
 def calculate_current_position(origin_coords, destination_coords, departure_time, shipping_class):
     now = datetime.datetime.now()
@@ -232,8 +293,24 @@ def ai_optimize_route_handler():
     to_city = data.get('to')
     traffic = data.get('traffic', 'medium')
     cargo = data.get('cargo_type', 'general')
+    algorithm = data.get('algorithm', 'astar')
+    # Per-node weather is opt-in for the precomputed algorithms, which need uniform weather
+    use_node_weather = bool(data.get('node_weather', algorithm not in ('ch', 'table')))
+    departure_time = data.get('departure_time')
 
-    if from_city not in graph or to_city not in graph:
+    try:
+        k = min(max(int(data.get('k', 1)), 1), MAX_ALTERNATIVE_ROUTES)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer."}), 400
+
+    if departure_time:
+        try:
+            departure_time = datetime.datetime.fromisoformat(departure_time)
+        except ValueError:
+            return jsonify({"error": "departure_time must be an ISO 8601 timestamp."}), 400
+
+    cities = get_compiled_graph().index
+    if from_city not in cities or to_city not in cities:
         return jsonify({"error": "Invalid city name."}), 400
 
     origin_coords = ports.get(from_city)
@@ -242,22 +319,17 @@ def ai_optimize_route_handler():
     if not origin_coords or not destination_coords:
         return jsonify({"error": "Missing coordinates for city"}), 400
 
-    origin_weather = get_current_weather(*origin_coords)
-    destination_weather = get_current_weather(*destination_coords)
+    origin_weather = weather_for(origin_coords)
+    destination_weather = weather_for(destination_coords)
 
-    condition_priority = {
-        "Clear skies": 1, "Partly cloudy": 2, "Overcast": 3,
-        "Light rain": 4, "Foggy": 4, "Windy": 5,
-        "Heavy rain": 6, "Stormy": 7, "Snowy": 8
-    }
+    weather = worst_condition(origin_weather["condition"], destination_weather["condition"])
 
-    weather = max(
-        [origin_weather["condition"], destination_weather["condition"]],
-        key=lambda x: condition_priority.get(x, 0)
+    result = ai_optimize_route(
+        from_city, to_city, weather, traffic, cargo,
+        algorithm=algorithm, k=k, departure_time=departure_time or None,
+        node_weather=grid_node_weather(weather, use_node_weather)
     )
 
-    result = ai_optimize_route(from_city, to_city, weather, traffic, cargo)
-
     result['weather_used'] = weather
     result['origin_weather'] = origin_weather
     result['destination_weather'] = destination_weather
@@ -269,6 +341,82 @@ def ai_optimize_route_handler():
 
 
 
+@app.route('/ai_optimize_routes', methods=['POST'])
+def ai_optimize_routes_handler():
+    """
+    Batch version of /ai_optimize_route.
+
+    Body: {"routes": [{"from": ..., "to": ..., "cargo_type": ...}, ...],
+           "cargo_type": ..., "node_weather": true}
+    Pairs are grouped by origin so each origin is searched once, and weather
+    is looked up once per distinct port. Grid weather per node is used for a
+    pair only where it differs from the weather at its endpoints, as for a
+    single route.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object with a 'routes' list."}), 400
+    pairs = data.get('routes', [])
+    default_cargo = data.get('cargo_type', 'general')
+    use_node_weather = bool(data.get('node_weather', True))
+
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({"error": "Expected a non-empty 'routes' list."}), 400
+
+    weather_by_port = {}
+
+    def port_weather(city):
+        if city not in weather_by_port:
+            weather_by_port[city] = weather_for(ports[city])
+        return weather_by_port[city]
+
+    queries = []
+    errors = {}
+    cities = get_compiled_graph().index
+    for i, pair in enumerate(pairs):
+        if not isinstance(pair, dict):
+            errors[i] = "Each route must be an object with 'from' and 'to'."
+            continue
+        from_city = pair.get('from')
+        to_city = pair.get('to')
+        if from_city not in cities or to_city not in cities:
+            errors[i] = "Invalid city name."
+        elif from_city not in ports or to_city not in ports:
+            errors[i] = "Missing coordinates for city"
+        else:
+            weather = worst_condition(port_weather(from_city)["condition"], port_weather(to_city)["condition"])
+            queries.append({
+                "index": i,
+                "origin": from_city,
+                "destination": to_city,
+                "weather": weather,
+                "cargo": pair.get('cargo_type', default_cargo)
+            })
+
+    results = [None] * len(pairs)
+    for i, message in errors.items():
+        results[i] = {"error": message}
+
+    # Same rule as a single route: grid weather only where it differs from the query's own
+    grid_queries, uniform_queries = [], []
+    for query in queries:
+        (grid_queries if grid_node_weather(query['weather'], use_node_weather) else uniform_queries).append(query)
+    batches = [(uniform_queries, None)]
+    if grid_queries:
+        batches.append((grid_queries, grid_node_weather(grid_queries[0]['weather'])))
+
+    for batch, node_weather in batches:
+        if not batch:
+            continue
+        for query, result in zip(batch, ai_optimize_routes(batch, node_weather=node_weather)):
+            result['weather_used'] = query['weather']
+            result['origin_weather'] = port_weather(query['origin'])
+            result['destination_weather'] = port_weather(query['destination'])
+            results[query['index']] = result
+
+    return jsonify({"results": results, "weather_lookups": len(weather_by_port)})
+
+
 @app.route('/document_suggestion', methods=['GET', 'POST'])
 def document_suggestion():
     suggested_docs = []
@@ -369,21 +517,15 @@ def dashboard():
         origin_coords = ports.get(from_city)
         dest_coords = ports.get(to_city)
 
-        origin_weather = get_current_weather(*origin_coords)
-        destination_weather = get_current_weather(*dest_coords)
+        origin_weather = weather_for(origin_coords)
+        destination_weather = weather_for(dest_coords)
 
-        condition_priority = {
-            "Clear skies": 1, "Partly cloudy": 2, "Overcast": 3,
-            "Light rain": 4, "Foggy": 4, "Windy": 5,
-            "Heavy rain": 6, "Stormy": 7, "Snowy": 8
-        }
+        weather = worst_condition(origin_weather["condition"], destination_weather["condition"])
 
-        weather = max(
-            [origin_weather["condition"], destination_weather["condition"]],
-            key=lambda x: condition_priority.get(x, 0)
+        result = ai_optimize_route(
+            from_city, to_city, weather, traffic, cargo,
+            node_weather=grid_node_weather(weather)
         )
-
-        result = ai_optimize_route(from_city, to_city, weather, traffic, cargo)
         result["origin_weather"] = origin_weather
         result["destination_weather"] = destination_weather
         result["weather_used"] = weather
@@ -399,6 +541,147 @@ def get_weather():
         "condition": "Mostly Sunny in Philly"
     })
 
+@app.route('/api/route_cache')
+def get_route_cache_stats():
+    return jsonify(route_cache.stats())
+
+@app.route('/api/weather_cache')
+def get_weather_cache_stats():
+    return jsonify(weather_cache.stats())
+
+@app.route('/api/provider_metrics')
+def get_provider_metrics():
+    return jsonify(provider_metrics())
+
+@app.route('/api/road_changes', methods=['GET', 'POST'])
+def road_changes():
+    """
+    Close, reopen or reweight a road without a restart.
+
+    Body: {"from": ..., "to": ..., "action": "close" | "reopen" | "reweight",
+           "weight": miles (reweight only)}
+    GET lists every road currently closed or reweighted; POST needs a login.
+    """
+    if request.method == 'GET':
+        return jsonify(edge_changes())
+    if not session.get('logged_in'):
+        return jsonify({"error": "Login required."}), 401
+
+    data = request.get_json() or {}
+    from_city = data.get('from')
+    to_city = data.get('to')
+    action = data.get('action')
+
+    if action == 'close':
+        result = close_edge(from_city, to_city)
+    elif action == 'reopen':
+        result = reopen_edge(from_city, to_city)
+    elif action == 'reweight':
+        try:
+            result = reweight_edge(from_city, to_city, float(data.get('weight')))
+        except (TypeError, ValueError):
+            return jsonify({"error": "weight must be a number."}), 400
+    else:
+        return jsonify({"error": "action must be 'close', 'reopen' or 'reweight'."}), 400
+
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@app.route('/ai_optimize_stops', methods=['POST'])
+def ai_optimize_stops():
+    """
+    Best visiting order for a multi-stop run, stitched into one route.
+
+    Body: {"start": ..., "stops": [...], "end": optional, "round_trip": bool,
+           "cargo_type": ..., "weather": default "Clear skies"}
+    Each road also gets the grid weather at its own endpoints.
+    """
+    data = request.get_json() or {}
+    stops = data.get('stops', [])
+    if not data.get('start') or not isinstance(stops, list) or not stops:
+        return jsonify({"error": "Expected a 'start' city and a non-empty 'stops' list."}), 400
+
+    weather = data.get('weather', 'Clear skies')
+    result = plan_stops(
+        data['start'], stops, weather, data.get('cargo_type', 'general'),
+        end=data.get('end'), round_trip=bool(data.get('round_trip')),
+        node_weather=grid_node_weather(weather)
+    )
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@app.route('/reachability')
+def reachability():
+    """
+    Cities reachable from a hub within N hours, per shipping class.
+
+    Query: hub, hours, optional shipping_class (all classes when omitted)
+    and departure_time (ISO 8601, default now). Each city reports road
+    miles as distance and traffic-adjusted miles as travel_cost; hours use
+    the class speed from SHIPPING_SPEEDS (km/h).
+    """
+    hub = request.args.get('hub')
+    shipping_class = request.args.get('shipping_class')
+    try:
+        hours = float(request.args.get('hours', ''))
+    except ValueError:
+        return jsonify({"error": "hours must be a number."}), 400
+    if not 0 < hours <= 24 * 14:
+        return jsonify({"error": "hours must be between 0 and 336."}), 400
+
+    if shipping_class and shipping_class not in SHIPPING_SPEEDS:
+        return jsonify({"error": f"shipping_class must be one of {sorted(SHIPPING_SPEEDS)}."}), 400
+    classes = [shipping_class] if shipping_class else list(SHIPPING_SPEEDS)
+
+    departure_time = request.args.get('departure_time')
+    try:
+        departure_time = datetime.datetime.fromisoformat(departure_time) if departure_time else datetime.datetime.now()
+    except ValueError:
+        return jsonify({"error": "departure_time must be an ISO 8601 timestamp."}), 400
+
+    reachable = {}
+    for name in classes:
+        cities = reachable_cities(hub, SHIPPING_SPEEDS[name], hours, departure_time)
+        if cities is None:
+            return jsonify({"error": "Invalid city name."}), 400
+        reachable[name] = cities
+
+    return jsonify({
+        "hub": hub,
+        "hours": hours,
+        "departure_time": departure_time.isoformat(),
+        "reachable": reachable,
+        "graph_version": get_compiled_graph().version
+    })
+
+@app.route('/api/graph', methods=['GET', 'POST'])
+def graph_version():
+    """
+    GET: version, fingerprint and size of the road graph being served.
+    POST {"file": name}: load GRAPH_DIR/name and swap it in; requests
+    already running finish on the previous version. POST needs a login.
+    """
+    if request.method == 'GET':
+        return jsonify(graph_info())
+    if not session.get('logged_in'):
+        return jsonify({"error": "Login required."}), 401
+
+    name = (request.get_json() or {}).get('file') or ''
+    path = os.path.join(GRAPH_DIR, os.path.basename(name))
+    if not name or not os.path.isfile(path):
+        return jsonify({"error": f"No graph file '{name}' in {GRAPH_DIR}."}), 400
+
+    try:
+        info = load_graph(path)
+    except (OSError, ValueError, KeyError) as err:
+        return jsonify({"error": f"Could not load {name}: {err}"}), 400
+
+    # New cities need weather cells too
+    weather_grid.register(get_compiled_graph().coords.tolist())
+    return jsonify(info)
+
 @app.route('/api/todo')
 def get_todo():
     return jsonify([
@@ -1,10 +1,17 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import os
+import sys
 import random
 import datetime
-import requests
 import sqlite3
 from geopy.distance import geodesic
 
+# Make the repo root importable when this file is run directly from app/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from optimizer.http_client import get_client
+from optimizer.weather_cache import WeatherCache
+from shipment_rollups import install_rollups, read_analytics
+
 app = Flask(__name__, template_folder='templates')
 app.secret_key = 'shipping_app_secret_key'
 DB_PATH = 'shipping.db'
@@ -24,6 +31,9 @@ ports = {
 
 # Weather API Setup
 WEATHER_API_KEY = "YOUR_API_KEY_HERE"  # <<< Replace with your real WeatherAPI key
+WEATHER_URL = "https://api.weatherapi.com/v1/current.json"
+weather_client = get_client("weather")
+WEATHER_CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", 300))  # seconds
 
 # Cost Settings
 RATE_PER_KM = 2  # $2 per kilometer
@@ -56,6 +66,7 @@ def init_db():
         )
     ''')
     conn.commit()
+    install_rollups(conn)
     conn.close()
 
 init_db()
@@ -75,17 +86,17 @@ def calculate_cost(distance, weight, shipping_class):
     return distance * base_rate * weight * multiplier
 
 # Get Weather
-def get_current_weather(lat, lon):
+def fetch_current_weather(lat, lon):
+    params = {
+        "key": WEATHER_API_KEY,
+        "q": f"{lat},{lon}",
+        "aqi": "no"
+    }
+    # Bounded by the shared client's deadline; None when the API is down
+    data = weather_client.get_json(WEATHER_URL, params=params)
+    if data is None:
+        return None
     try:
-        url = "https://api.weatherapi.com/v1/current.json"
-        params = {
-            "key": WEATHER_API_KEY,
-            "q": f"{lat},{lon}",
-            "aqi": "no"
-        }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
         weather_info = {
             "location": data["location"]["name"],
             "temp_c": data["current"]["temp_c"],
@@ -98,6 +109,12 @@ def get_current_weather(lat, lon):
         print(f"Weather API error: {e}")
         return None
 
+# Cached by rounded coordinates; concurrent misses share one upstream call
+weather_cache = WeatherCache(fetch_current_weather, ttl=WEATHER_CACHE_TTL)
+
+def get_current_weather(lat, lon):
+    return weather_cache.get(lat, lon)
+
 # Save shipment to DB
 def add_shipment_to_db(shipment_data):
     conn = sqlite3.connect(DB_PATH)
@@ -132,6 +149,20 @@ def get_shipments():
     conn.close()
     return shipments
 
+# Aggregate dashboard figures
+def get_analytics(top=5):
+    """
+    Dashboard figures, read from the rollup rows the shipments triggers
+    keep current rather than from shipments itself.
+
+    Returns:
+        tuple: (stats, shipping_classes, top_origins, top_destinations, top_routes)
+    """
+    conn = sqlite3.connect(DB_PATH)
+    figures = read_analytics(conn, top)
+    conn.close()
+    return figures
+
 # Generate fake shipments
 def generate_fake_shipments(num_shipments=20):
     for _ in range(num_shipments):
@@ -175,42 +206,11 @@ def index():
 # Analytics Dashboard
 @app.route('/analytics')
 def analytics():
-    shipments = get_shipments()
+    stats, shipping_classes, top_origins, top_destinations, top_routes = get_analytics()
 
     default_port_coords = ports["New York"]
     weather = get_current_weather(default_port_coords[0], default_port_coords[1])
 
-    stats = {
-        'total_shipments': len(shipments),
-        'active_shipments': sum(1 for s in shipments if s['status'] in ['Preparing', 'Departed', 'In Transit']),
-        'completed_shipments': sum(1 for s in shipments if s['status'] == 'Arrived'),
-        'total_distance': sum(s['distance'] for s in shipments),
-        'total_cost': sum(s['cost'] for s in shipments),
-        'avg_cost_per_km': sum(s['cost'] for s in shipments) / sum(s['distance'] for s in shipments) if shipments else 0
-    }
-
-    shipping_classes = {
-        'standard': sum(1 for s in shipments if s['shipping_class'] == 'standard'),
-        'express': sum(1 for s in shipments if s['shipping_class'] == 'express'),
-        'heavy_cargo': sum(1 for s in shipments if s['shipping_class'] == 'heavy_cargo')
-    }
-
-    origin_counts = {}
-    for s in shipments:
-        origin_counts[s['origin']] = origin_counts.get(s['origin'], 0) + 1
-    top_origins = sorted(origin_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-
-    dest_counts = {}
-    for s in shipments:
-        dest_counts[s['destination']] = dest_counts.get(s['destination'], 0) + 1
-    top_destinations = sorted(dest_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-
-    route_profits = {}
-    for s in shipments:
-        route = f"{s['origin']} to {s['destination']}"
-        route_profits[route] = route_profits.get(route, 0) + s['cost']
-    top_routes = sorted(route_profits.items(), key=lambda x: x[1], reverse=True)[:5]
-
     return render_template('analytics.html',
         stats=stats,
         shipping_classes=shipping_classes,
@@ -221,6 +221,10 @@ def analytics():
     )
 
 
+@app.route('/api/weather_cache')
+def weather_cache_stats():
+    return jsonify(weather_cache.stats())
+
 # Route to generate fake shipments
 @app.route('/generate_fake_shipments')
 def generate_fake_shipments_route():
@@ -1,8 +1,14 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, g
 from geopy.distance import geodesic
+import atexit
 import datetime
+import queue
 import random
 import sqlite3
+import threading
+import time
+
+from shipment_rollups import daily_totals, install_rollups, read_analytics
 
 app = Flask(__name__, template_folder='templates')
 app.config['DEBUG'] = True
@@ -11,6 +17,85 @@ app.secret_key = 'shipping_app_secret_key'
 # Database setup
 DB_PATH = 'shipping.db'
 
+# Applied to every new connection; journal_mode=WAL persists in the file itself
+DB_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',      # safe with WAL, fsync only at checkpoints
+    'PRAGMA cache_size=-20000',       # 20 MB page cache per connection
+    'PRAGMA mmap_size=268435456',     # read through a 256 MB memory map
+    'PRAGMA temp_store=MEMORY'
+)
+DB_STATEMENT_CACHE = 128   # prepared statements kept per connection
+DB_BUSY_TIMEOUT = 5.0      # seconds a writer waits for the lock
+DB_POOL_SIZE = 8           # idle connections kept for reuse between requests
+STATUS_UPDATE_SECONDS = 60 # how often stored statuses catch up with the clock
+
+# Shipment list pages
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+ACTIVE_STATUSES = ('Preparing', 'Departed', 'In Transit')  # shipments still shown on the map
+
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+def _connect():
+    # A pooled connection serves one app context at a time, but not always on the same thread
+    conn = sqlite3.connect(
+        DB_PATH, timeout=DB_BUSY_TIMEOUT, cached_statements=DB_STATEMENT_CACHE, check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_db():
+    """
+    Return the current app context's connection, taking an idle one from
+    the pool (or opening one) on first use.
+
+    release_db hands it back when the context ends, so requests reuse
+    connections and their prepared statement caches without one being kept
+    per thread. In WAL mode readers are not blocked by a concurrent writer.
+    """
+    if 'db' not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = _connect()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    """Return the context's connection to the pool, closing it if the pool is full."""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        _db_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Releasing database connection failed: {e}")
+        conn.close()
+
+def close_db():
+    """
+    Close every idle pooled connection. Runs at interpreter exit, so the
+    last close checkpoints the WAL back into shipping.db.
+    """
+    while True:
+        try:
+            conn = _db_pool.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Closing database connection failed: {e}")
+
+atexit.register(close_db)
+
 # Predefined ports with their coordinates (latitude, longitude)
 ports = {
     'New York': (40.7128, -74.0060),
@@ -73,7 +158,7 @@ SHIP_SPEED = {
 
 def init_db():
     """Initialize the database with necessary tables"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     # Create shipments table
@@ -94,12 +179,24 @@ def init_db():
     )
     ''')
     
+    # Indexes for the filters, status sweeps and dashboards. An index on a
+    # rowid table also orders by id within each key, so status and
+    # destination pages walk the index in id order too.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipments_status ON shipments (status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipments_route ON shipments (origin, destination)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipments_destination ON shipments (destination)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipments_eta ON shipments (eta)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_shipments_created_at ON shipments (created_at)')
+    
     conn.commit()
-    conn.close()
+    
+    # Rollup table and the triggers that maintain it for the dashboard
+    install_rollups(conn)
     print("Database initialized successfully!")
 
 # Initialize database at startup
-init_db()
+with app.app_context():
+    init_db()
 
 def calculate_distance(port1_coords, port2_coords):
     """Calculate distance between two ports using geodesic."""
@@ -121,8 +218,8 @@ def calculate_eta(distance, shipping_class):
     speed = SHIP_SPEED[shipping_class]
     return distance / speed
 
-def calculate_current_position(origin_coords, destination_coords, departure_time, shipping_class):
-    """Calculate current ship position based on departure time and speed."""
+def calculate_current_position(origin_coords, destination_coords, departure_time, shipping_class, eta=None):
+    """Calculate current ship position based on departure time and speed (or the stored ETA)."""
     if departure_time is None:
         return origin_coords, "Preparing"
         
@@ -130,8 +227,11 @@ def calculate_current_position(origin_coords, destination_coords, departure_time
     hours_elapsed = (now - departure_time).total_seconds() / 3600
     
     # Calculate total journey duration
-    distance = calculate_distance(origin_coords, destination_coords)
-    total_hours = distance / SHIP_SPEED[shipping_class]
+    if eta is not None:
+        total_hours = (eta - departure_time).total_seconds() / 3600
+    else:
+        distance = calculate_distance(origin_coords, destination_coords)
+        total_hours = distance / SHIP_SPEED[shipping_class]
     
     # If ship has arrived, return destination
     if hours_elapsed >= total_hours:
@@ -147,13 +247,44 @@ def calculate_current_position(origin_coords, destination_coords, departure_time
     return (current_lat, current_lng), 'In Transit'
 
 # Database functions
-def get_shipments():
-    """Get all shipments from the database"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_shipments(after_id=None, limit=None, status=None, origin=None, destination=None, active=False):
+    """
+    Get shipments from the database, newest first.
+
+    Pages are keyset-paginated: pass the last id of one page as after_id to
+    get the next, so every page is an index range scan however deep it is.
+    status, origin and destination filter on the stored values, and active
+    keeps only shipments that have not arrived; either status filter first
+    brings stored statuses up to now, so it matches the status reported.
+    limit=None returns every matching shipment.
+    """
+    if status or active:
+        advance_shipment_statuses()
+    conn = get_db()
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM shipments ORDER BY id DESC')
+    clauses = []
+    params = []
+    for column, value in (('status', status), ('origin', origin), ('destination', destination)):
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    if active:
+        clauses.append(f"status IN ({', '.join('?' * len(ACTIVE_STATUSES))})")
+        params.extend(ACTIVE_STATUSES)
+    if after_id is not None:
+        clauses.append('id < ?')
+        params.append(after_id)
+    
+    query = 'SELECT * FROM shipments'
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY id DESC'
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    
+    cursor.execute(query, params)
     shipments_rows = cursor.fetchall()
     
     # Convert to list of dictionaries
@@ -180,23 +311,21 @@ def get_shipments():
                 origin_coords, 
                 destination_coords, 
                 shipment['departure_time'], 
-                shipment['shipping_class']
+                shipment['shipping_class'],
+                shipment['eta']
             )
             shipment['current_position'] = current_position
             
-            # Update status in the database if needed
-            if status != shipment['status']:
-                update_shipment_status(shipment['id'], status)
-                shipment['status'] = status
+            # Report the status as of now; advance_shipment_statuses persists it
+            shipment['status'] = status
                 
         shipments.append(shipment)
     
-    conn.close()
     return shipments
 
 def add_shipment_to_db(shipment_data):
     """Add a new shipment to the database"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -219,13 +348,12 @@ def add_shipment_to_db(shipment_data):
     
     shipment_id = cursor.lastrowid
     conn.commit()
-    conn.close()
     
     return shipment_id
 
 def update_shipment_status(shipment_id, status):
     """Update a shipment's status in the database"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute(
@@ -234,11 +362,48 @@ def update_shipment_status(shipment_id, status):
     )
     
     conn.commit()
-    conn.close()
+
+def advance_shipment_statuses(now=None):
+    """
+    Move every departed shipment to 'In Transit' or 'Arrived' as of now in
+    one UPDATE, the same transitions get_shipments reports.
+
+    Returns:
+        int: number of shipments whose status changed
+    """
+    now = (now or datetime.datetime.now()).isoformat()
+    conn = get_db()
+    with conn:
+        cursor = conn.execute('''
+        UPDATE shipments
+        SET status = CASE
+            WHEN departure_time IS NULL THEN 'Preparing'
+            WHEN eta <= :now THEN 'Arrived'
+            ELSE 'In Transit'
+        END
+        WHERE status NOT IN ('Preparing', 'Arrived')
+          AND (departure_time IS NULL OR eta <= :now OR status != 'In Transit')
+        ''', {'now': now})
+    return cursor.rowcount
+
+def start_status_updater(interval=STATUS_UPDATE_SECONDS):
+    """Run advance_shipment_statuses now and then every interval seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    advance_shipment_statuses()
+            except sqlite3.Error as e:
+                print(f"Status update failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="shipment-status", daemon=True)
+    thread.start()
+    return thread
 
 def start_shipment_in_db(shipment_id):
     """Update shipment to 'Departed' status with current departure time"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     # Get shipment info
@@ -246,7 +411,6 @@ def start_shipment_in_db(shipment_id):
     shipment = cursor.fetchone()
     
     if not shipment:
-        conn.close()
         return False
     
     # Calculate updated ETA
@@ -265,12 +429,47 @@ def start_shipment_in_db(shipment_id):
     )
     
     conn.commit()
-    conn.close()
     return True
 
+def get_analytics(top=5):
+    """
+    Dashboard figures, read from the rollup rows the shipments triggers
+    keep current rather than from shipments itself.
+
+    Returns:
+        tuple: (stats, shipping_classes, top_origins, top_destinations, top_routes)
+    """
+    return read_analytics(get_db(), top)
+
+def page_args(args):
+    """
+    Read after_id, limit, status, origin, destination and active from a query string.
+
+    Returns:
+        dict: keyword arguments for get_shipments; raises ValueError on a bad number
+    """
+    after_id = args.get('after_id')
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    return {
+        'after_id': int(after_id) if after_id else None,
+        'limit': min(max(limit, 1), MAX_PAGE_SIZE),
+        'status': args.get('status'),
+        'origin': args.get('origin'),
+        'destination': args.get('destination'),
+        'active': args.get('active') in ('1', 'true')
+    }
+
+def next_after_id(shipments, limit):
+    """Cursor for the page after this one, or None when this is the last page."""
+    return shipments[-1]['id'] if len(shipments) == limit else None
+
+# Keep stored statuses current so reads never have to write them
+start_status_updater()
+
 @app.route('/')
 def index():
-    shipments = get_shipments()
+    # The list itself is filled and paged by the page's JS from /get_shipments_data
+    shipments = get_shipments(limit=DEFAULT_PAGE_SIZE)
     return render_template('index.html', ports=sorted(ports.keys()), shipments=shipments)
 
 @app.route('/get_ports_data')
@@ -282,8 +481,19 @@ def get_ports_data():
 
 @app.route('/get_shipments_data')
 def get_shipments_data():
-    """API endpoint to get shipment data for the map"""
-    shipments = get_shipments()
+    """
+    API endpoint to get shipment data for the map, one page at a time.
+
+    Query: after_id, limit (default 100), status, origin, destination and
+    active=1 for shipments that have not arrived. The body stays a JSON
+    list; when there is another page its cursor is in the X-Next-After-Id
+    header and a rel="next" Link header.
+    """
+    try:
+        page = page_args(request.args)
+    except ValueError:
+        return jsonify({"error": "after_id and limit must be integers."}), 400
+    shipments = get_shipments(**page)
     
     shipments_data = []
     for shipment in shipments:
@@ -312,61 +522,59 @@ def get_shipments_data():
                 'lng': shipment['current_position'][1]
             },
             'shipping_class': shipment['shipping_class'],
+            'weight': shipment['weight'],
+            'distance': shipment['distance'],
+            'cost': shipment['cost'],
             'status': shipment['status'],
             'ship_name': shipment['ship_name'],
             'eta': eta_display
         })
     
     print("Shipments data endpoint called - returning data for", len(shipments_data), "shipments")
-    return jsonify(shipments_data)
+    response = jsonify(shipments_data)
+    cursor = next_after_id(shipments, page['limit'])
+    if cursor is not None:
+        next_args = {key: value for key, value in request.args.items() if key != 'after_id'}
+        response.headers['X-Next-After-Id'] = str(cursor)
+        response.headers['Link'] = f'<{url_for("get_shipments_data", after_id=cursor, **next_args)}>; rel="next"'
+    return response
 
-if __name__ == '__main__':
-    print("Starting database version of shipping app...")
-    print("Access the app at http://127.0.0.1:5000")
-    app.run(debug=True, port=5000)
+@app.route('/ship_tracker')
+def ship_tracker():
+    """Full-screen map of the ships that have not arrived"""
+    return render_template('ship_tracker.html')
+
+@app.route('/generate_fake_shipments')
+def generate_fake_shipments():
+    """Add 20 random shipments, still preparing, to try the list and map with"""
+    for _ in range(20):
+        origin, destination = random.sample(list(ports.keys()), 2)
+        weight = round(random.uniform(5.0, 500.0), 2)
+        shipping_class = random.choice(list(SHIP_SPEED))
+        distance = calculate_distance(ports[origin], ports[destination])
+        add_shipment_to_db({
+            'ship_name': f"Ship-{random.randint(1000, 9999)}",
+            'origin': origin,
+            'destination': destination,
+            'weight': weight,
+            'shipping_class': shipping_class,
+            'distance': distance,
+            'cost': calculate_cost(distance, weight, shipping_class),
+            'status': 'Preparing',
+            'departure_time': None,
+            'eta': None
+        })
+    flash('20 fake shipments generated successfully!', 'success')
+    return redirect(url_for('index'))
+
+@app.route('/contact')
+def contact():
+    return render_template('contact.html')
 
-# Add this new route to your app_db.py
 @app.route('/analytics')
 def analytics():
     """Display analytics dashboard with charts and insights"""
-    # Get all shipments
-    shipments = get_shipments()
-    
-    # Calculate statistics
-    stats = {
-        'total_shipments': len(shipments),
-        'active_shipments': sum(1 for s in shipments if s['status'] in ['Preparing', 'Departed', 'In Transit']),
-        'completed_shipments': sum(1 for s in shipments if s['status'] == 'Arrived'),
-        'total_distance': sum(s['distance'] for s in shipments),
-        'total_cost': sum(s['cost'] for s in shipments),
-        'avg_cost_per_km': sum(s['cost'] for s in shipments) / sum(s['distance'] for s in shipments) if shipments else 0
-    }
-    
-    # Calculate shipping class distribution
-    shipping_classes = {
-        'standard': sum(1 for s in shipments if s['shipping_class'] == 'standard'),
-        'express': sum(1 for s in shipments if s['shipping_class'] == 'express'),
-        'heavy_cargo': sum(1 for s in shipments if s['shipping_class'] == 'heavy_cargo')
-    }
-    
-    # Calculate top origin ports
-    origin_counts = {}
-    for s in shipments:
-        origin_counts[s['origin']] = origin_counts.get(s['origin'], 0) + 1
-    top_origins = sorted(origin_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    
-    # Calculate top destination ports
-    dest_counts = {}
-    for s in shipments:
-        dest_counts[s['destination']] = dest_counts.get(s['destination'], 0) + 1
-    top_destinations = sorted(dest_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    
-    # Calculate most profitable routes
-    route_profits = {}
-    for s in shipments:
-        route = f"{s['origin']} to {s['destination']}"
-        route_profits[route] = route_profits.get(route, 0) + s['cost']
-    top_routes = sorted(route_profits.items(), key=lambda x: x[1], reverse=True)[:5]
+    stats, shipping_classes, top_origins, top_destinations, top_routes = get_analytics()
     
     return render_template(
         'analytics.html', 
@@ -375,4 +583,18 @@ def analytics():
         top_origins=top_origins,
         top_destinations=top_destinations,
         top_routes=top_routes
-    )
\ No newline at end of file
+    )
+
+@app.route('/analytics/daily')
+def analytics_daily():
+    """Shipments, distance and cost per day for the last ?days= days (default 30)"""
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({"error": "days must be an integer."}), 400
+    return jsonify(daily_totals(get_db(), min(max(days, 1), 366)))
+
+if __name__ == '__main__':
+    print("Starting database version of shipping app...")
+    print("Access the app at http://127.0.0.1:5000")
+    app.run(debug=True, port=5000)
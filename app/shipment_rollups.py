@@ -0,0 +1,167 @@
+# /app/shipment_rollups.py
+"""
+Running totals behind the /analytics dashboards.
+
+shipment_rollups holds one row per (dimension, key), e.g. ('origin',
+'Hamburg') or ('day', '2025-05-06'), with the number of shipments and
+their summed distance and cost. Triggers on shipments keep it current, so
+every insert, start or status change updates the rollups inside the same
+transaction whichever app or function made it. An update only touches
+the dimensions whose columns changed, so a status transition moves one
+count from the old status row to the new one.
+
+The dashboard then reads a few dozen rows however long the history is.
+If the table is ever out of step (or predates the triggers), rebuild it:
+    python app/shipment_rollups.py [path/to/shipping.db]
+The database defaults to app/shipping.db, the one app.py and app_db.py use.
+"""
+
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shipping.db")
+
+# dimension: (key expression over a shipments row, columns the key reads)
+ROLLUPS = {
+    "status": ("{row}.status", ("status",)),
+    "shipping_class": ("{row}.shipping_class", ("shipping_class",)),
+    "origin": ("{row}.origin", ("origin",)),
+    "destination": ("{row}.destination", ("destination",)),
+    "route": ("{row}.origin || ' to ' || {row}.destination", ("origin", "destination")),
+    "day": ("date({row}.created_at)", ("created_at",)),
+}
+
+ACTIVE_STATUSES = ("Preparing", "Departed", "In Transit")
+
+_UPSERT = """
+    INSERT INTO shipment_rollups (dimension, key, shipments, distance, cost)
+    VALUES ('{dimension}', COALESCE({key}, ''), {sign}1, {sign}COALESCE({row}.distance, 0), {sign}COALESCE({row}.cost, 0))
+    ON CONFLICT (dimension, key) DO UPDATE SET
+        shipments = shipments + excluded.shipments,
+        distance = distance + excluded.distance,
+        cost = cost + excluded.cost;
+"""
+
+
+def _upsert(dimension, row, sign):
+    key = ROLLUPS[dimension][0].format(row=row)
+    return _UPSERT.format(dimension=dimension, key=key, row=row, sign=sign)
+
+
+def _trigger_sql():
+    """CREATE TRIGGER statements keeping shipment_rollups in step with shipments."""
+    insert = "".join(_upsert(dimension, "NEW", "") for dimension in ROLLUPS)
+    delete = "".join(_upsert(dimension, "OLD", "-") for dimension in ROLLUPS)
+    statements = [
+        f"CREATE TRIGGER IF NOT EXISTS shipment_rollups_insert AFTER INSERT ON shipments BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS shipment_rollups_delete AFTER DELETE ON shipments BEGIN {delete} END",
+    ]
+    for dimension, (_, columns) in ROLLUPS.items():
+        watched = columns + ("distance", "cost")
+        changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in watched)
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS shipment_rollups_update_{dimension} "
+            f"AFTER UPDATE OF {', '.join(watched)} ON shipments WHEN {changed} "
+            f"BEGIN {_upsert(dimension, 'OLD', '-')}{_upsert(dimension, 'NEW', '')} END"
+        )
+    return statements
+
+
+def install_rollups(conn):
+    """
+    Create the rollup table and its triggers if missing, filling the table
+    from shipments the first time. Commits.
+    """
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shipment_rollups (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                shipments INTEGER NOT NULL DEFAULT 0,
+                distance REAL NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, key)
+            ) WITHOUT ROWID
+        """)
+        for statement in _trigger_sql():
+            conn.execute(statement)
+        if conn.execute("SELECT 1 FROM shipment_rollups LIMIT 1").fetchone() is None:
+            _fill(conn)
+
+
+def _fill(conn):
+    for dimension, (key, _) in ROLLUPS.items():
+        conn.execute(f"""
+            INSERT INTO shipment_rollups (dimension, key, shipments, distance, cost)
+            SELECT ?, COALESCE({key.format(row='shipments')}, '') AS k, COUNT(*),
+                   COALESCE(SUM(distance), 0), COALESCE(SUM(cost), 0)
+            FROM shipments GROUP BY k
+        """, (dimension,))
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup row from shipments in one transaction."""
+    with conn:
+        conn.execute("DELETE FROM shipment_rollups")
+        _fill(conn)
+
+
+def _rows(conn, dimension, order="shipments", top=None):
+    query = f"SELECT key, shipments, distance, cost FROM shipment_rollups WHERE dimension = ? AND shipments > 0 ORDER BY {order} DESC, key"
+    params = [dimension]
+    if top is not None:
+        query += " LIMIT ?"
+        params.append(top)
+    return conn.execute(query, params).fetchall()
+
+
+def read_analytics(conn, top=5):
+    """
+    Dashboard figures from the rollups.
+
+    Returns:
+        tuple: (stats, shipping_classes, top_origins, top_destinations, top_routes),
+        shaped as the analytics.html template expects
+    """
+    statuses = {key: (count, distance, cost) for key, count, distance, cost in _rows(conn, "status")}
+    total = sum(count for count, _, _ in statuses.values())
+    distance = sum(d for _, d, _ in statuses.values())
+    cost = sum(c for _, _, c in statuses.values())
+    stats = {
+        "total_shipments": total,
+        "active_shipments": sum(statuses.get(status, (0,))[0] for status in ACTIVE_STATUSES),
+        "completed_shipments": statuses.get("Arrived", (0,))[0],
+        "total_distance": distance,
+        "total_cost": cost,
+        "avg_cost_per_km": cost / distance if distance else 0
+    }
+
+    classes = {key: count for key, count, _, _ in _rows(conn, "shipping_class")}
+    shipping_classes = {name: classes.get(name, 0) for name in ("standard", "express", "heavy_cargo")}
+
+    top_origins = [(key, count) for key, count, _, _ in _rows(conn, "origin", top=top)]
+    top_destinations = [(key, count) for key, count, _, _ in _rows(conn, "destination", top=top)]
+    top_routes = [(key, cost) for key, _, _, cost in _rows(conn, "route", order="cost", top=top)]
+    return stats, shipping_classes, top_origins, top_destinations, top_routes
+
+
+def daily_totals(conn, days=30):
+    """Shipments, distance and cost per creation day, most recent days first."""
+    rows = conn.execute(
+        "SELECT key, shipments, distance, cost FROM shipment_rollups WHERE dimension = 'day' AND shipments > 0 "
+        "ORDER BY key DESC LIMIT ?", (days,)
+    ).fetchall()
+    return [{"day": day, "shipments": count, "distance": distance, "cost": cost} for day, count, distance, cost in rows]
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    if not os.path.isfile(db_path):
+        sys.exit(f"No database at {db_path}")
+    connection = sqlite3.connect(db_path)
+    install_rollups(connection)
+    rebuild_rollups(connection)
+    count = connection.execute("SELECT COUNT(*) FROM shipment_rollups").fetchone()[0]
+    print(f"Rebuilt {count} rollup rows in {db_path}")
+    connection.close()
@@ -0,0 +1,264 @@
+# /optimizer/all_pairs.py
+"""
+Dense all-pairs distance and next-hop tables over the base road weights.
+
+Tables are built with a vectorized Floyd-Warshall and saved under models/
+with the compiled graph's fingerprint in the file name, so a changed graph
+simply misses the old files and gets a fresh build, made in the background
+while queries fall back to Dijkstra. As with the contraction
+hierarchy, weather and cargo are applied as uniform multipliers on the
+result and live traffic is not part of the table.
+"""
+
+import glob
+import os
+import queue
+import threading
+
+import numpy as np
+
+from .dijkstra import INF, one_to_many
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+class AllPairsTable:
+    """dist[i, j] is the shortest base cost i -> j; next_hop[i, j] the first node after i, or -1."""
+
+    def __init__(self, fingerprint, dist, next_hop):
+        self.fingerprint = fingerprint
+        self.dist = dist
+        self.next_hop = next_hop
+
+    def path(self, source, target):
+        """Walk next-hop pointers; empty list when target is unreachable."""
+        if source == target:
+            return [source]
+        if self.next_hop[source, target] < 0:
+            return []
+        path = [source]
+        node = source
+        while node != target:
+            node = int(self.next_hop[node, target])
+            path.append(node)
+        return path
+
+
+def build_table(cg):
+    """Floyd-Warshall over cg, one vectorized relaxation pass per pivot node."""
+    n = cg.num_nodes
+    dist = np.full((n, n), np.inf)
+    next_hop = np.full((n, n), -1, dtype=np.int32)
+
+    # Parallel edges keep the cheapest weight.
+    sources, targets, weights = cg.sources, cg.targets, cg.weights
+    order = np.argsort(-weights, kind="stable")
+    dist[sources[order], targets[order]] = weights[order]
+    open_edges = np.isfinite(weights)
+    next_hop[sources[open_edges], targets[open_edges]] = targets[open_edges]
+    np.fill_diagonal(dist, 0.0)
+    np.fill_diagonal(next_hop, np.arange(n, dtype=np.int32))
+
+    for k in range(n):
+        via = dist[:, k, None] + dist[None, k, :]
+        better = via < dist
+        if better.any():
+            dist = np.where(better, via, dist)
+            next_hop = np.where(better, next_hop[:, k, None], next_hop)
+
+    return AllPairsTable(cg.fingerprint, dist, next_hop)
+
+
+def _tree_row(cg, source, weights):
+    """One Dijkstra from source, as a (dist, next_hop) table row."""
+    n = cg.num_nodes
+    dist, parent_edge = one_to_many(cg, source, range(n), weights)
+    sources = cg.sources_list
+
+    next_hop = [-1] * n
+    next_hop[source] = source
+    for node in sorted(range(n), key=dist.__getitem__):
+        e = parent_edge[node]
+        if e >= 0:
+            tail = sources[e]
+            next_hop[node] = node if tail == source else next_hop[tail]
+    return dist, next_hop
+
+
+def repair_table(table, cg, edge, old_weight):
+    """
+    Update a table for one changed edge, recomputing only the origin rows
+    whose shortest-path tree can change.
+
+    A heavier (or closed) edge u -> v only matters to origins whose best
+    route to v runs over it; a lighter one only to origins it now gives a
+    shorter route to v. Every other row is copied unchanged.
+
+    Params:
+        table (AllPairsTable): table for the graph before the change
+        cg (CompiledGraph): the graph after the change, same edge ids
+        edge (int): id of the changed edge
+        old_weight (float): its base weight before the change
+
+    Returns:
+        tuple: (AllPairsTable for cg, number of origin rows recomputed)
+    """
+    u, v = cg.sources_list[edge], cg.targets_list[edge]
+    new_weight = cg.weights_list[edge]
+    dist = table.dist.copy()
+    next_hop = table.next_hop.copy()
+
+    with np.errstate(invalid="ignore"):
+        if new_weight > old_weight:
+            affected = np.isfinite(dist[:, v]) & np.isclose(dist[:, u] + old_weight, dist[:, v])
+        else:
+            affected = dist[:, u] + new_weight < dist[:, v]
+
+    weights = cg.weights_list
+    rows = np.flatnonzero(affected).tolist()
+    for source in rows:
+        dist[source], next_hop[source] = _tree_row(cg, source, weights)
+
+    return AllPairsTable(cg.fingerprint, dist, next_hop), len(rows)
+
+
+def _paths(fingerprint, directory):
+    stem = os.path.join(directory, f"all_pairs_{fingerprint[:16]}")
+    return stem + "_dist.npy", stem + "_next.npy"
+
+
+def save_table(table, directory=TABLE_DIR):
+    """Write the table as two .npy files and drop tables for older graphs."""
+    dist_path, next_path = _paths(table.fingerprint, directory)
+    np.save(dist_path, table.dist)
+    np.save(next_path, table.next_hop)
+    for old in glob.glob(os.path.join(directory, "all_pairs_*.npy")):
+        if old not in (dist_path, next_path):
+            os.remove(old)
+
+
+def load_table(fingerprint, directory=TABLE_DIR):
+    """Load the table for a graph fingerprint, or None if it was never built."""
+    dist_path, next_path = _paths(fingerprint, directory)
+    if not (os.path.exists(dist_path) and os.path.exists(next_path)):
+        return None
+    return AllPairsTable(fingerprint, np.load(dist_path), np.load(next_path))
+
+
+_table = None
+_building = set()  # fingerprints with a load or build in progress
+_lock = threading.Lock()
+
+
+def _load_or_build(cg, directory):
+    global _table
+    try:
+        table = load_table(cg.fingerprint, directory)
+        if table is None:
+            table = build_table(cg)
+            save_table(table, directory)
+        with _lock:
+            _table = table
+    except (OSError, ValueError, MemoryError) as e:
+        print(f"[Optimizer] All-pairs table build failed: {e}")
+    finally:
+        with _lock:
+            _building.discard(cg.fingerprint)
+
+
+def get_table(cg, directory=TABLE_DIR):
+    """
+    Return the table for cg, or None while it is not ready yet.
+
+    A graph without a table gets one loaded from disk or built on a daemon
+    thread, so the O(n^3) build never runs inside a request.
+    """
+    table = _table
+    if table is not None and table.fingerprint == cg.fingerprint:
+        return table
+    with _lock:
+        if cg.fingerprint not in _building:
+            _building.add(cg.fingerprint)
+            threading.Thread(
+                target=_load_or_build, args=(cg, directory), name="all-pairs-table", daemon=True
+            ).start()
+    return None
+
+
+_repairs = queue.Queue()
+_repair_target = None  # fingerprint the table will have once queued repairs finish
+_repairer = None
+
+
+def _repair_worker():
+    global _repair_target
+    while True:
+        before, after, edge, old_weight = _repairs.get()
+        try:
+            table = _table
+            if table is not None and table.fingerprint == before:
+                table, rows = repair_table(table, after, edge, old_weight)
+                install_table(table)
+                print(f"[Optimizer] All-pairs table repaired: {rows} origins recomputed")
+        except (ValueError, MemoryError) as e:
+            print(f"[Optimizer] All-pairs table repair failed: {e}")
+        finally:
+            with _lock:
+                _building.discard(after.fingerprint)
+                if _repair_target == after.fingerprint:
+                    _repair_target = None
+
+
+def schedule_repair(before, after, edge, old_weight):
+    """
+    Patch the table for one edge change on a daemon thread instead of
+    rebuilding it. Changes are repaired in order; until a repair lands,
+    get_table returns None for `after` and queries fall back to Dijkstra.
+
+    Params:
+        before (CompiledGraph): the graph the change was made on
+        after (CompiledGraph): the graph after the change, same edge ids
+        edge (int): id of the changed edge
+        old_weight (float): its base weight before the change
+
+    Returns:
+        bool: True if a repair was queued, False if no table for `before` is
+        served or pending (the next get_table builds one for `after`)
+    """
+    global _repair_target, _repairer
+    with _lock:
+        served = _repair_target or (_table.fingerprint if _table is not None else None)
+        if served != before.fingerprint:
+            return False
+        _repair_target = after.fingerprint
+        _building.add(after.fingerprint)
+        _repairs.put((before.fingerprint, after, edge, old_weight))
+        if _repairer is None or not _repairer.is_alive():
+            _repairer = threading.Thread(target=_repair_worker, name="all-pairs-repair", daemon=True)
+            _repairer.start()
+    return True
+
+
+def install_table(table):
+    """Serve an in-memory table, e.g. one patched by repair_table, without saving it."""
+    global _table
+    with _lock:
+        _table = table
+
+
+def current_table():
+    """The table being served, or None if none has been built or loaded yet."""
+    return _table
+
+
+def table_path(table, source, target):
+    """
+    Shortest path on base weights by table lookup.
+
+    Returns:
+        tuple: (cost, path as node ids, nodes expanded)
+    """
+    path = table.path(source, target)
+    if not path:
+        return INF, [], 0
+    return float(table.dist[source, target]), path, 0
@@ -0,0 +1,65 @@
+import heapq
+
+from .dijkstra import INF, build_path
+from .geo import haversine_miles_array
+
+
+def straight_line_bounds(cg, target, scale):
+    """
+    Per-node lower bound on the remaining cost to target.
+
+    scale multiplies great-circle miles and must not exceed the smallest
+    cost-per-straight-mile of any edge, see edge_weights.heuristic_scale.
+    """
+    if scale <= 0 or not cg.has_coords:
+        return [0.0] * cg.num_nodes
+    return (scale * haversine_miles_array(cg.coords, cg.coords[target])).tolist()
+
+
+def astar_path(cg, source, target, weights, scale):
+    """
+    A* over a CompiledGraph with a great-circle heuristic.
+
+    Params:
+        cg (CompiledGraph): compiled road graph
+        source (int), target (int): node ids
+        weights (list): adjusted cost per edge id
+        scale (float): heuristic multiplier, see straight_line_bounds
+
+    Returns:
+        tuple: (cost, path as node ids, nodes expanded)
+    """
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    n = cg.num_nodes
+    h = straight_line_bounds(cg, target, scale)
+
+    dist = [INF] * n
+    parent_edge = [-1] * n
+    settled = bytearray(n)
+    dist[source] = 0.0
+    queue = [(h[source], source)]
+    expanded = 0
+
+    while queue:
+        _, node = heapq.heappop(queue)
+        if settled[node]:
+            continue
+        settled[node] = 1
+        expanded += 1
+        cost = dist[node]
+
+        if node == target:
+            return cost, build_path(cg, parent_edge, target), expanded
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+            new_cost = cost + weights[e]
+            if new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (new_cost + h[neighbor], neighbor))
+
+    return INF, [], expanded
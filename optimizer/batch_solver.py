@@ -0,0 +1,137 @@
+# /optimizer/batch_solver.py
+"""
+Multi-process batch routing for large re-planning runs.
+
+The parent packs the compiled graph once into a multiprocessing
+shared_memory block, in the .rgraph layout with base x traffic weights
+in place of the base weights. Each worker maps that block when it starts,
+so the graph is never pickled; tasks carry only city names. As in
+optimize_routes, queries are grouped by origin and each group is one
+one-to-many search, scaled per query by its uniform weather and cargo
+factors. Groups are spread over the pool and results are yielded as each
+group finishes.
+
+Nightly runs can stream a JSON list of queries through it:
+    python -m optimizer.batch_solver queries.json > results.jsonl
+"""
+
+import json
+import os
+import sys
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from .compiled_graph import CompiledGraph, get_compiled_graph
+from .dijkstra import INF, build_path, condition_factors, one_to_many, route_result
+from .edge_weights import build_weight_vector
+from .graph_format import pack_graph, unpack_graph
+
+DEFAULT_GROUP_SIZE = 64
+
+# Per-worker state, set by _init_worker
+_worker = {}
+
+
+def _init_worker(block_name, version):
+    block = shared_memory.SharedMemory(name=block_name)
+    data = unpack_graph(np.ndarray((block.size,), dtype=np.uint8, buffer=block.buf), block_name)
+    cg = CompiledGraph(data["names"], data["offsets"], data["targets"], data["weights"], data["coords"])
+    cg.version = version
+    cg.mapped = True
+    _worker.update(block=block, cg=cg, weights=cg.weights_list)
+
+
+def _solve_group(task):
+    """One origin's queries: [(index, result), ...]."""
+    origin, members = task
+    cg = _worker["cg"]
+    source = cg.index[origin]
+    wanted = {cg.index[destination] for _, destination, _, _ in members}
+    dist, parent_edge = one_to_many(cg, source, wanted, _worker["weights"])
+
+    solved = []
+    for i, destination, weather, cargo in members:
+        target = cg.index[destination]
+        if dist[target] == INF:
+            result = route_result(cg, INF, [])
+        else:
+            w_factor, c_factor = condition_factors(weather, cargo)
+            result = route_result(cg, dist[target] * w_factor * c_factor, build_path(cg, parent_edge, target))
+        result["graph_version"] = cg.version
+        solved.append((i, result))
+    return solved
+
+
+def _groups(cg, queries, group_size):
+    """Split queries into per-origin tasks of at most group_size, and collect invalid ones."""
+    by_origin = {}
+    invalid = []
+    for i, query in enumerate(queries):
+        origin, destination = query["origin"], query["destination"]
+        if origin not in cg.index or destination not in cg.index:
+            invalid.append(i)
+            continue
+        by_origin.setdefault(origin, []).append((i, destination, query["weather"], query["cargo"]))
+
+    tasks = []
+    for origin, members in by_origin.items():
+        for start in range(0, len(members), group_size):
+            tasks.append((origin, members[start:start + group_size]))
+    # Largest groups first so the pool does not end on one long straggler
+    tasks.sort(key=lambda task: -len(task[1]))
+    return tasks, invalid
+
+
+def solve_routes(queries, processes=None, group_size=DEFAULT_GROUP_SIZE):
+    """
+    Route many queries on a process pool, yielding results as they complete.
+
+    Params:
+        queries (list): dicts with 'origin', 'destination', 'weather' and 'cargo'
+        processes (int): pool size; os.cpu_count() by default
+        group_size (int): most queries from one origin handled by one task
+
+    Yields:
+        tuple: (index into queries, result dict as from optimize_routes),
+        in completion order
+    """
+    cg = get_compiled_graph()
+    tasks, invalid = _groups(cg, queries, group_size)
+    for i in invalid:
+        yield i, {
+            "route": [],
+            "total_distance": INF,
+            "error": "Invalid city name",
+            "graph_version": cg.version
+        }
+    if not tasks:
+        return
+
+    # Traffic is part of the shared weights; weather and cargo scale per query.
+    packed = pack_graph(cg, build_weight_vector(cg))
+    block = shared_memory.SharedMemory(create=True, size=len(packed))
+    try:
+        block.buf[:len(packed)] = packed
+        processes = min(processes or os.cpu_count() or 1, len(tasks))
+        with Pool(processes, initializer=_init_worker, initargs=(block.name, cg.version)) as pool:
+            for solved in pool.imap_unordered(_solve_group, tasks):
+                yield from solved
+    finally:
+        block.close()
+        block.unlink()
+
+
+def solve_routes_list(queries, processes=None, group_size=DEFAULT_GROUP_SIZE):
+    """solve_routes collected into one result per query, in input order."""
+    results = [None] * len(queries)
+    for i, result in solve_routes(queries, processes, group_size):
+        results[i] = result
+    return results
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], encoding="utf-8") as f:
+        batch = json.load(f)
+    for index, result in solve_routes(batch):
+        print(json.dumps({"index": index, **result}), flush=True)
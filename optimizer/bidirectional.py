@@ -0,0 +1,98 @@
+import heapq
+
+from .dijkstra import INF
+
+
+def _walk(parent_edge, ends, node):
+    """Follow parent-edge pointers from node; ends maps an edge to the node it leads back to."""
+    nodes = []
+    e = parent_edge[node]
+    while e != -1:
+        node = ends[e]
+        nodes.append(node)
+        e = parent_edge[node]
+    return nodes
+
+
+def bidirectional_path(cg, source, target, weights):
+    """
+    Bidirectional Dijkstra over a CompiledGraph.
+
+    The forward search follows out-edges from source, the backward search
+    follows the reverse index from target. Both read weights by forward
+    edge id, so one-way edges are handled correctly. The search stops once
+    the two queue heads together can no longer beat the best meeting cost.
+
+    Returns:
+        tuple: (cost, path as node ids, nodes expanded)
+    """
+    if source == target:
+        return 0.0, [source], 1
+
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    r_offsets = cg.reverse_offsets_list
+    r_edges = cg.reverse_edges_list
+    sources = cg.sources_list
+    n = cg.num_nodes
+
+    dist_f = [INF] * n
+    dist_b = [INF] * n
+    parent_f = [-1] * n
+    parent_b = [-1] * n
+    settled_f = bytearray(n)
+    settled_b = bytearray(n)
+    dist_f[source] = 0.0
+    dist_b[target] = 0.0
+    queue_f = [(0.0, source)]
+    queue_b = [(0.0, target)]
+
+    best = INF
+    meet = -1
+    expanded = 0
+
+    while queue_f and queue_b:
+        if queue_f[0][0] + queue_b[0][0] >= best:
+            break
+
+        if queue_f[0][0] <= queue_b[0][0]:
+            cost, node = heapq.heappop(queue_f)
+            if settled_f[node]:
+                continue
+            settled_f[node] = 1
+            expanded += 1
+            for e in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[e]
+                new_cost = cost + weights[e]
+                if new_cost < dist_f[neighbor]:
+                    dist_f[neighbor] = new_cost
+                    parent_f[neighbor] = e
+                    heapq.heappush(queue_f, (new_cost, neighbor))
+                if new_cost + dist_b[neighbor] < best:
+                    best = new_cost + dist_b[neighbor]
+                    meet = neighbor
+        else:
+            cost, node = heapq.heappop(queue_b)
+            if settled_b[node]:
+                continue
+            settled_b[node] = 1
+            expanded += 1
+            for i in range(r_offsets[node], r_offsets[node + 1]):
+                e = r_edges[i]
+                neighbor = sources[e]
+                new_cost = cost + weights[e]
+                if new_cost < dist_b[neighbor]:
+                    dist_b[neighbor] = new_cost
+                    parent_b[neighbor] = e
+                    heapq.heappush(queue_b, (new_cost, neighbor))
+                if new_cost + dist_f[neighbor] < best:
+                    best = new_cost + dist_f[neighbor]
+                    meet = neighbor
+
+    if meet == -1:
+        return INF, [], expanded
+
+    head = _walk(parent_f, sources, meet)
+    head.reverse()
+    tail = _walk(parent_b, targets, meet)
+    return best, head + [meet] + tail, expanded
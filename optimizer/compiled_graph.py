@@ -0,0 +1,242 @@
+# /optimizer/compiled_graph.py
+
+import hashlib
+import os
+import threading
+from functools import cached_property
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_MILES
+from .graph_format import read_graph_arrays
+
+# Serve this .rgraph file instead of compiling graph_utils.graph at import
+GRAPH_FILE = os.environ.get("ROAD_GRAPH_FILE")
+
+
+class CompiledGraph:
+    """
+    Integer-indexed, CSR form of an adjacency dict.
+
+    City names are interned to ids 0..n-1 once. The out-edges of node u are
+    targets[offsets[u]:offsets[u + 1]] with the matching base weights, so an
+    edge is identified by its position e in those arrays. coords is an (n, 2)
+    lat/lon array, NaN where a node has no known position.
+
+    A graph is never modified once it is being served; version is the
+    number it was published under by set_compiled_graph (0 until then).
+    A mapped graph (one read from an .rgraph file or shared memory) serves
+    its *_list mirrors as memoryviews over the arrays instead of lists.
+    """
+
+    def __init__(self, names, offsets, targets, weights, coords=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if coords is None:
+            coords = np.full((len(self.names), 2), np.nan)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.version = 0
+        self.mapped = False
+
+    @cached_property
+    def fingerprint(self):
+        """Content hash of names, topology and base weights; changes whenever the graph does."""
+        digest = hashlib.sha1()
+        digest.update("\0".join(self.names).encode("utf-8"))
+        for array in (self.offsets, self.targets, self.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    @cached_property
+    def topology_fingerprint(self):
+        """Hash of names, edges and coordinates only; unchanged when just base weights change."""
+        digest = hashlib.sha1()
+        digest.update("\0".join(self.names).encode("utf-8"))
+        for array in (self.offsets, self.targets, self.coords):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def with_weights(self, weights):
+        """
+        Same nodes and edge ids with new base weights. Everything derived
+        from the topology alone (reverse index, edge miles, list mirrors) is
+        shared with self rather than rebuilt.
+        """
+        clone = CompiledGraph.__new__(CompiledGraph)
+        clone.__dict__.update(
+            (name, value) for name, value in self.__dict__.items()
+            if name not in ("fingerprint", "weights_list")
+        )
+        clone.weights = np.asarray(weights, dtype=np.float64)
+        clone.version = 0
+        return clone
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    # Plain-list mirrors: indexing a list from the pure-Python search loops
+    # is several times cheaper than indexing a numpy array. A list costs
+    # about 40 bytes per element in every process, so a mapped graph gets
+    # memoryviews instead: nearly as fast to index, and no copy of the map.
+    def _mirror(self, array):
+        if self.mapped:
+            return memoryview(np.ascontiguousarray(array))
+        return array.tolist()
+
+    @cached_property
+    def offsets_list(self):
+        return self._mirror(self.offsets)
+
+    @cached_property
+    def targets_list(self):
+        return self._mirror(self.targets)
+
+    @cached_property
+    def weights_list(self):
+        return self._mirror(self.weights)
+
+    @cached_property
+    def sources(self):
+        """Tail node of every edge, aligned with targets/weights."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets))
+
+    @cached_property
+    def sources_list(self):
+        return self._mirror(self.sources)
+
+    # Reverse index: the in-edges of node v are the forward edge ids
+    # reverse_edges[reverse_offsets[v]:reverse_offsets[v + 1]], so weights
+    # looked up by edge id are shared by forward and backward searches.
+    @cached_property
+    def reverse_offsets(self):
+        counts = np.bincount(self.targets, minlength=self.num_nodes)
+        return np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    @cached_property
+    def reverse_edges(self):
+        return np.argsort(self.targets, kind="stable").astype(np.int64)
+
+    @cached_property
+    def reverse_offsets_list(self):
+        return self._mirror(self.reverse_offsets)
+
+    @cached_property
+    def reverse_edges_list(self):
+        return self._mirror(self.reverse_edges)
+
+    @cached_property
+    def has_coords(self):
+        return not np.isnan(self.coords).any()
+
+    @cached_property
+    def edge_miles(self):
+        """Great-circle miles of every edge, aligned with targets/weights."""
+        if not self.has_coords:
+            return np.full(self.num_edges, np.nan)
+        lat = np.radians(self.coords[:, 0])
+        lon = np.radians(self.coords[:, 1])
+        u, v = self.sources, self.targets
+        h = np.sin((lat[v] - lat[u]) / 2) ** 2 + np.cos(lat[u]) * np.cos(lat[v]) * np.sin((lon[v] - lon[u]) / 2) ** 2
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+    def edge_id(self, u, v):
+        """Return the edge id of u -> v, or -1 if there is no such edge."""
+        targets = self.targets_list
+        for e in range(self.offsets_list[u], self.offsets_list[u + 1]):
+            if targets[e] == v:
+                return e
+        return -1
+
+    def path_names(self, path):
+        return [self.names[i] for i in path]
+
+
+def compile_graph(adjacency, positions=None):
+    """
+    Build a CompiledGraph from a {city: {neighbor: weight}} dict.
+
+    Cities that only appear as a neighbor still get an id (with no out-edges).
+    positions is an optional {city: (lat, lon)} dict.
+    """
+    names = list(adjacency)
+    seen = set(names)
+    for neighbors in adjacency.values():
+        for neighbor in neighbors:
+            if neighbor not in seen:
+                seen.add(neighbor)
+                names.append(neighbor)
+    index = {name: i for i, name in enumerate(names)}
+
+    offsets = [0]
+    targets = []
+    weights = []
+    for name in names:
+        for neighbor, weight in adjacency.get(name, {}).items():
+            targets.append(index[neighbor])
+            weights.append(weight)
+        offsets.append(len(targets))
+
+    positions = positions or {}
+    coords = [positions.get(name, (np.nan, np.nan)) for name in names]
+
+    return CompiledGraph(names, offsets, targets, weights, coords)
+
+
+def load_graph_file(path):
+    """CompiledGraph over a memory-mapped .rgraph file; see optimizer.graph_format."""
+    data = read_graph_arrays(path)
+    cg = CompiledGraph(data["names"], data["offsets"], data["targets"], data["weights"], data["coords"])
+    # Stored at write time, so a cold start does not hash every edge
+    cg.fingerprint = data["fingerprint"]
+    cg.mapped = True
+    return cg
+
+
+def _boot_graph():
+    if GRAPH_FILE:
+        return load_graph_file(GRAPH_FILE)
+    from .graph_utils import graph, coordinates
+    return compile_graph(graph, coordinates)
+
+
+def warm(cg):
+    """
+    Build the reverse index up front rather than on the first query. A
+    mapped graph is left cold, so loading one stays a header parse.
+    """
+    if cg.mapped:
+        return cg
+    cg.reverse_edges_list
+    cg.reverse_offsets_list
+    return cg
+
+
+# The graph being served. Readers take one reference per request and use it
+# throughout, so a swap never changes the graph under an in-flight search.
+# Writers that derive a new graph from the current one hold swap_lock from
+# reading it to publishing the result, so concurrent swaps cannot be lost.
+_compiled = warm(_boot_graph())
+_compiled.version = 1
+swap_lock = threading.RLock()
+
+
+def get_compiled_graph():
+    """Return the graph currently being served (the boot graph until a reload or road change)."""
+    return _compiled
+
+
+def set_compiled_graph(cg):
+    """Publish cg under the next version number; new requests use it from now on."""
+    global _compiled
+    with swap_lock:
+        cg.version = _compiled.version + 1
+        _compiled = cg
+    return cg
@@ -0,0 +1,276 @@
+# /optimizer/contraction.py
+"""
+Contraction hierarchy over the base road weights.
+
+Build it offline whenever graph_utils.graph changes:
+
+    python -m optimizer.contraction
+
+Queries then run a bidirectional search that only climbs to higher-ranked
+nodes, which settles a handful of nodes instead of the whole graph. Weather
+and cargo are uniform multipliers, so they are applied to the result and
+never change which path is shortest. Live traffic is not part of the
+hierarchy.
+"""
+
+import heapq
+import os
+import pickle
+
+from .compiled_graph import get_compiled_graph
+from .dijkstra import INF
+
+HIERARCHY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "contraction_hierarchy.pkl")
+
+# Witness searches give up after settling this many nodes; a missed witness
+# only adds a redundant shortcut, never a wrong answer.
+WITNESS_SETTLE_LIMIT = 60
+
+
+class ContractionHierarchy:
+    """
+    rank[v] is the contraction order of v. up_out[u] lists (v, cost) for
+    edges u -> v with rank[v] > rank[u]; up_in[v] lists (u, cost) for edges
+    u -> v with rank[u] > rank[v]. middle maps a shortcut (u, v) to the
+    contracted node it bypasses.
+    """
+
+    def __init__(self, fingerprint, rank, up_out, up_in, middle):
+        self.fingerprint = fingerprint
+        self.rank = rank
+        self.up_out = up_out
+        self.up_in = up_in
+        self.middle = middle
+
+    def is_current(self, cg):
+        return self.fingerprint == cg.fingerprint
+
+
+def _witness_costs(out_adj, source, skip, limit):
+    """Bounded Dijkstra from source in the remaining graph, avoiding skip."""
+    dist = {source: 0.0}
+    queue = [(0.0, source)]
+    settled = 0
+    while queue and settled < WITNESS_SETTLE_LIMIT:
+        cost, node = heapq.heappop(queue)
+        if cost > dist[node]:
+            continue
+        if cost > limit:
+            break
+        settled += 1
+        for neighbor, weight in out_adj[node].items():
+            if neighbor == skip:
+                continue
+            new_cost = cost + weight
+            if new_cost < dist.get(neighbor, INF):
+                dist[neighbor] = new_cost
+                heapq.heappush(queue, (new_cost, neighbor))
+    return dist
+
+
+def _shortcuts(out_adj, in_adj, node):
+    """Shortcuts (u, w, cost) needed to keep distances exact if node is removed."""
+    needed = []
+    outgoing = out_adj[node]
+    for u, w_in in in_adj[node].items():
+        if not outgoing:
+            break
+        limit = w_in + max(outgoing.values())
+        dist = _witness_costs(out_adj, u, node, limit)
+        for w, w_out in outgoing.items():
+            if w == u:
+                continue
+            via = w_in + w_out
+            if dist.get(w, INF) > via:
+                needed.append((u, w, via))
+    return needed
+
+
+def _priority(out_adj, in_adj, node, contracted_neighbors):
+    """Edge difference plus a term that spreads contraction evenly over the graph."""
+    shortcuts = len(_shortcuts(out_adj, in_adj, node))
+    return shortcuts - len(out_adj[node]) - len(in_adj[node]) + contracted_neighbors[node]
+
+
+def build_hierarchy(cg):
+    """Contract every node of a CompiledGraph and return its ContractionHierarchy."""
+    n = cg.num_nodes
+    out_adj = [{} for _ in range(n)]
+    in_adj = [{} for _ in range(n)]
+    # Cheapest known edge for every (u, v) pair, original or shortcut.
+    edges = {}
+    for u, v, weight in zip(cg.sources_list, cg.targets_list, cg.weights_list):
+        if u == v or weight >= out_adj[u].get(v, INF):
+            continue
+        out_adj[u][v] = weight
+        in_adj[v][u] = weight
+        edges[(u, v)] = weight
+
+    middle = {}
+    contracted_neighbors = [0] * n
+    queue = [(_priority(out_adj, in_adj, v, contracted_neighbors), v) for v in range(n)]
+    heapq.heapify(queue)
+    rank = [0] * n
+    order = 0
+
+    while queue:
+        _, node = heapq.heappop(queue)
+        # Lazy update: re-evaluate and put it back if it is no longer the minimum.
+        priority = _priority(out_adj, in_adj, node, contracted_neighbors)
+        if queue and priority > queue[0][0]:
+            heapq.heappush(queue, (priority, node))
+            continue
+
+        for u, w, cost in _shortcuts(out_adj, in_adj, node):
+            if cost < out_adj[u].get(w, INF):
+                out_adj[u][w] = cost
+                in_adj[w][u] = cost
+                edges[(u, w)] = cost
+                middle[(u, w)] = node
+
+        for neighbor in out_adj[node]:
+            del in_adj[neighbor][node]
+            contracted_neighbors[neighbor] += 1
+        for neighbor in in_adj[node]:
+            del out_adj[neighbor][node]
+            contracted_neighbors[neighbor] += 1
+        out_adj[node] = {}
+        in_adj[node] = {}
+
+        rank[node] = order
+        order += 1
+
+    up_out = [[] for _ in range(n)]
+    up_in = [[] for _ in range(n)]
+    for (u, v), cost in edges.items():
+        if rank[v] > rank[u]:
+            up_out[u].append((v, cost))
+        else:
+            up_in[v].append((u, cost))
+
+    return ContractionHierarchy(cg.fingerprint, rank, up_out, up_in, middle)
+
+
+def save_hierarchy(ch, path=HIERARCHY_PATH):
+    # Pickle plain containers so the file loads whether it was written by
+    # "python -m optimizer.contraction" or from inside the app.
+    with open(path, "wb") as f:
+        pickle.dump(vars(ch), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_hierarchy(path=HIERARCHY_PATH):
+    """Load a saved hierarchy, or return None if there is none on disk."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return ContractionHierarchy(**pickle.load(f))
+
+
+# path: (file mtime or None, hierarchy loaded from it)
+_loaded = {}
+
+
+def get_hierarchy(cg, path=HIERARCHY_PATH):
+    """
+    Return the saved hierarchy for cg, or None if it is missing or stale.
+
+    The file is re-read whenever its modification time changes, so a
+    hierarchy rebuilt for a newly loaded graph is picked up without a restart.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    entry = _loaded.get(path)
+    if entry is None or entry[0] != mtime:
+        entry = _loaded[path] = (mtime, load_hierarchy(path) if mtime is not None else None)
+    ch = entry[1]
+    if ch is None or not ch.is_current(cg):
+        return None
+    return ch
+
+
+def _unpack(ch, u, v, out):
+    """Append the original nodes after u on edge u -> v, expanding shortcuts."""
+    m = ch.middle.get((u, v))
+    if m is None:
+        out.append(v)
+        return
+    _unpack(ch, u, m, out)
+    _unpack(ch, m, v, out)
+
+
+def hierarchy_path(ch, source, target):
+    """
+    Shortest path on base weights using the upward bidirectional CH search.
+
+    Returns:
+        tuple: (cost, path as node ids, nodes expanded)
+    """
+    if source == target:
+        return 0.0, [source], 1
+
+    up_out = ch.up_out
+    up_in = ch.up_in
+    dist_f = {source: 0.0}
+    dist_b = {target: 0.0}
+    parent_f = {source: -1}
+    parent_b = {target: -1}
+    queue_f = [(0.0, source)]
+    queue_b = [(0.0, target)]
+    best = INF
+    meet = -1
+    expanded = 0
+
+    while queue_f or queue_b:
+        forward = bool(queue_f) and (not queue_b or queue_f[0][0] <= queue_b[0][0])
+        if forward:
+            queue, dist, other, parent, adj = queue_f, dist_f, dist_b, parent_f, up_out
+        else:
+            queue, dist, other, parent, adj = queue_b, dist_b, dist_f, parent_b, up_in
+
+        cost, node = heapq.heappop(queue)
+        if cost > dist[node]:
+            continue
+        if cost >= best:
+            # Nothing left in this direction can improve the answer.
+            queue.clear()
+            continue
+        expanded += 1
+
+        if node in other and cost + other[node] < best:
+            best = cost + other[node]
+            meet = node
+
+        for neighbor, weight in adj[node]:
+            new_cost = cost + weight
+            if new_cost < dist.get(neighbor, INF):
+                dist[neighbor] = new_cost
+                parent[neighbor] = node
+                heapq.heappush(queue, (new_cost, neighbor))
+
+    if meet == -1:
+        return INF, [], expanded
+
+    head = [meet]
+    while parent_f[head[-1]] != -1:
+        head.append(parent_f[head[-1]])
+    head.reverse()
+    tail = [meet]
+    while parent_b[tail[-1]] != -1:
+        tail.append(parent_b[tail[-1]])
+
+    path = [source]
+    for u, v in zip(head, head[1:]):
+        _unpack(ch, u, v, path)
+    for u, v in zip(tail, tail[1:]):
+        _unpack(ch, u, v, path)
+    return best, path, expanded
+
+
+if __name__ == "__main__":
+    cg = get_compiled_graph()
+    ch = build_hierarchy(cg)
+    save_hierarchy(ch)
+    shortcuts = len(ch.middle)
+    print(f"Saved contraction hierarchy for {cg.num_nodes} nodes ({shortcuts} shortcuts) to {HIERARCHY_PATH}")
@@ -1,42 +1,178 @@
 import heapq
 from .factors import weather_factor, cargo_factor
-from .graph_utils import graph
-from .traffic_api import get_live_traffic_factor
+from .graph_utils import graph as default_graph
+from .compiled_graph import compile_graph, get_compiled_graph
+from .edge_weights import build_weight_vector
 
-def dijkstra(graph, start, end, weather, traffic=None, cargo=None):
-    queue = [(0, start, [])]
-    seen = set()
+INF = float("inf")
+
+
+def condition_factors(weather, cargo):
+    """Smart adjustment factors that apply to every edge of a query."""
+    return weather_factor(weather), cargo_factor(cargo)
+
+
+def build_path(cg, parent_edge, target):
+    """Walk parent-edge pointers back from target and return the node ids in order."""
+    sources = cg.sources_list
+    path = [target]
+    e = parent_edge[target]
+    while e != -1:
+        node = sources[e]
+        path.append(node)
+        e = parent_edge[node]
+    path.reverse()
+    return path
+
+
+def shortest_path(cg, source, target, weights):
+    """
+    Dijkstra over a CompiledGraph with integer node ids.
+
+    Params:
+        cg (CompiledGraph): compiled road graph
+        source (int), target (int): node ids
+        weights (list): adjusted cost per edge id, see build_weight_vector
+
+    Returns:
+        tuple: (cost, path as node ids, nodes expanded); cost is inf and
+        path empty when target is unreachable
+    """
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    n = cg.num_nodes
+
+    dist = [INF] * n
+    parent_edge = [-1] * n
+    settled = bytearray(n)
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+    expanded = 0
 
     while queue:
-        cost, node, path = heapq.heappop(queue)
-        if node in seen:
+        cost, node = heapq.heappop(queue)
+        if settled[node]:
+            continue
+        settled[node] = 1
+        expanded += 1
+
+        if node == target:
+            return cost, build_path(cg, parent_edge, target), expanded
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+            new_cost = cost + weights[e]
+            if new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (new_cost, neighbor))
+
+    return INF, [], expanded
+
+
+def one_to_many(cg, source, wanted, weights):
+    """
+    Dijkstra from source that stops once every node in wanted is settled.
+
+    Returns:
+        tuple: (dist, parent_edge) lists indexed by node id; use build_path
+        to get the route to any settled node
+    """
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    n = cg.num_nodes
+
+    dist = [INF] * n
+    parent_edge = [-1] * n
+    settled = bytearray(n)
+    remaining = set(wanted)
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+
+    while queue and remaining:
+        cost, node = heapq.heappop(queue)
+        if settled[node]:
             continue
-        path = path + [node]
-        seen.add(node)
+        settled[node] = 1
+        remaining.discard(node)
 
-        if node == end:
-            return {
-                "route": path,
-                "total_distance": round(cost, 2)
-            }
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+            new_cost = cost + weights[e]
+            if new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (new_cost, neighbor))
 
-        for neighbor, base_weight in graph.get(node, {}).items():
-            # Smart adjustment factors
-            w_factor = weather_factor(weather)
-            c_factor = cargo_factor(cargo)
+    return dist, parent_edge
 
-            try:
-                t_factor = get_live_traffic_factor(node, neighbor)
-            except Exception as e:
-                print(f"[Traffic API error] {node} → {neighbor}: {e}")
-                t_factor = 1.0
 
-            adjusted_weight = base_weight * w_factor * t_factor * c_factor
-            heapq.heappush(queue, (cost + adjusted_weight, neighbor, path))
+def bounded_search(cg, source, weights, budget):
+    """
+    Dijkstra from source that stops at the first node costing more than budget.
 
+    Returns:
+        tuple: (settled, dist, parent_edge) where settled lists the node ids
+        within budget in order of cost, source first
+    """
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    n = cg.num_nodes
+
+    dist = [INF] * n
+    parent_edge = [-1] * n
+    done = bytearray(n)
+    settled = []
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > budget:
+            break
+        if done[node]:
+            continue
+        done[node] = 1
+        settled.append(node)
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if done[neighbor]:
+                continue
+            new_cost = cost + weights[e]
+            if new_cost <= budget and new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (new_cost, neighbor))
+
+    return settled, dist, parent_edge
+
+
+def route_result(cg, cost, path, expanded=0):
+    """Shape a search result the way the API has always returned it."""
+    if not path:
+        return {
+            "route": [],
+            "total_distance": INF,
+            "error": "No path found",
+            "nodes_expanded": expanded
+        }
     return {
-        "route": [],
-        "total_distance": float("inf"),
-        "error": "No path found"
+        "route": cg.path_names(path),
+        "total_distance": round(cost, 2),
+        "nodes_expanded": expanded
     }
 
+
+def dijkstra(graph, start, end, weather, traffic=None, cargo=None):
+    cg = get_compiled_graph() if graph is default_graph else compile_graph(graph)
+    if start not in cg.index or end not in cg.index:
+        return route_result(cg, INF, [])
+
+    weights = build_weight_vector(cg, weather, cargo).tolist()
+    cost, path, expanded = shortest_path(cg, cg.index[start], cg.index[end], weights)
+    return route_result(cg, cost, path, expanded)
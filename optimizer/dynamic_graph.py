@@ -0,0 +1,133 @@
+# /optimizer/dynamic_graph.py
+"""
+Runtime road closures and reweights.
+
+A change never alters the graph's shape: a closed road keeps its edge id
+with an infinite base weight, so the traffic snapshot, hourly layers and
+weather cells (all keyed by topology) stay valid. Each change publishes a
+new compiled graph with a new fingerprint, which retires cached routes and
+the contraction hierarchy (queries for 'ch' fall back to Dijkstra until it
+is rebuilt). A loaded all-pairs table is patched on a background thread in
+place of a rebuild: only origins whose shortest-path tree runs over, or now
+benefits from, the changed edge are recomputed. Changes outlive a graph
+reload for every road the reloaded graph still has (see rebase).
+"""
+
+import math
+
+from .all_pairs import schedule_repair
+from .compiled_graph import get_compiled_graph, set_compiled_graph, swap_lock
+from .dijkstra import INF
+
+_base = get_compiled_graph()
+_reweighted = {}   # (origin, destination) -> base weight replacing the original
+_closed = set()    # (origin, destination) currently blocked
+
+
+def _edge(cg, origin, destination):
+    source, target = cg.index.get(origin), cg.index.get(destination)
+    if source is None or target is None:
+        return -1
+    return cg.edge_id(source, target)
+
+
+def _weight(road, edge):
+    """Base weight road should be served with: INF when closed, else its latest weight."""
+    if road in _closed:
+        return INF
+    return _reweighted.get(road, _base.weights_list[edge])
+
+
+def _apply(origin, destination, change):
+    cg = get_compiled_graph()
+    edge = _edge(cg, origin, destination)
+    if edge < 0:
+        return {"error": f"No road from {origin} to {destination}"}
+
+    road = (origin, destination)
+    change(road)
+    old_weight = cg.weights_list[edge]
+    new_weight = _weight(road, edge)
+
+    result = {
+        "from": origin,
+        "to": destination,
+        "closed": road in _closed,
+        "weight": _reweighted.get(road, _base.weights_list[edge]),
+        "table_repair_queued": False,
+        "graph_version": cg.version
+    }
+    if new_weight == old_weight:
+        return result
+
+    weights = cg.weights.copy()
+    weights[edge] = new_weight
+    updated = cg.with_weights(weights)
+
+    result["table_repair_queued"] = schedule_repair(cg, updated, edge, old_weight)
+    result["graph_version"] = set_compiled_graph(updated).version
+    return result
+
+
+def close_edge(origin, destination):
+    """Block the road origin -> destination until reopen_edge."""
+    with swap_lock:
+        return _apply(origin, destination, _closed.add)
+
+
+def reopen_edge(origin, destination):
+    """Unblock a closed road; it comes back with its latest weight."""
+    with swap_lock:
+        return _apply(origin, destination, _closed.discard)
+
+
+def reweight_edge(origin, destination, weight):
+    """Set the base weight (miles) of origin -> destination; a closed road stays closed."""
+    if not (math.isfinite(weight) and weight > 0):
+        return {"error": "Weight must be a positive, finite number; use close_edge to block a road"}
+
+    def change(road):
+        _reweighted[road] = float(weight)
+
+    with swap_lock:
+        return _apply(origin, destination, change)
+
+
+def rebase(cg):
+    """
+    Make cg, a freshly loaded graph, the base for road changes, and return
+    it with the changes still in force applied. Changes to roads cg does not
+    have are dropped. Called by the graph registry before publishing.
+    """
+    global _base
+    with swap_lock:
+        _base = cg
+        for road in list(_closed | set(_reweighted)):
+            if _edge(cg, *road) < 0:
+                _closed.discard(road)
+                _reweighted.pop(road, None)
+
+        roads = _closed | set(_reweighted)
+        if not roads:
+            return cg
+        weights = cg.weights.copy()
+        for road in roads:
+            edge = _edge(cg, *road)
+            weights[edge] = _weight(road, edge)
+        return cg.with_weights(weights)
+
+
+def edge_changes():
+    """Every road currently closed or reweighted, with its base and current weight."""
+    with swap_lock:
+        changes = []
+        for origin, destination in sorted(_closed | set(_reweighted)):
+            base_weight = _base.weights_list[_edge(_base, origin, destination)]
+            changes.append({
+                "from": origin,
+                "to": destination,
+                "closed": (origin, destination) in _closed,
+                "base_weight": base_weight,
+                "weight": _reweighted.get((origin, destination), base_weight)
+            })
+        return changes
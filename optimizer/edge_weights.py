@@ -0,0 +1,61 @@
+# /optimizer/edge_weights.py
+"""
+Per-query edge cost vectors.
+
+All factors are applied once per query with NumPy over the edge arrays,
+and the search just indexes the resulting list. Weather can be given per
+node: an edge takes the worse factor of its two endpoints, so a storm in
+Houston only slows the roads into and out of Houston.
+"""
+
+import numpy as np
+
+from .factors import weather_factor, cargo_factor
+from .traffic_snapshot import get_snapshot
+
+
+def node_weather_factors(cg, weather=None, node_weather=None):
+    """Weather factor per node: node_weather's where it has one, else the query-wide weather."""
+    default = weather_factor(weather) if weather is not None else 1.0
+    if node_weather is None:
+        return np.full(cg.num_nodes, default)
+    return node_weather.for_graph(cg, default)
+
+
+def build_weight_vector(cg, weather=None, cargo=None, snapshot=None, node_weather=None, traffic=True):
+    """
+    Edge costs for one query as a NumPy array aligned with cg's edge ids:
+    base weight x weather x traffic x cargo.
+
+    Params:
+        weather (str): condition for every node not in node_weather; None for 1.0
+        cargo (str): cargo type; None for 1.0
+        snapshot (TrafficSnapshot): traffic factors; the current one by default
+        node_weather (NodeWeather): optional per-node factors from the weather grid
+        traffic (bool): False to leave traffic out (time-dependent layers add it)
+    """
+    if node_weather is not None:
+        node_factors = node_weather_factors(cg, weather, node_weather)
+        w_factor = np.maximum(node_factors[cg.sources], node_factors[cg.targets])
+    else:
+        w_factor = weather_factor(weather) if weather is not None else 1.0
+    c_factor = cargo_factor(cargo) if cargo is not None else 1.0
+
+    vector = cg.weights * w_factor
+    if traffic:
+        vector = vector * (snapshot or get_snapshot(cg)).factors
+    return vector * c_factor
+
+
+def heuristic_scale(cg, vector):
+    """
+    Largest s with s * great_circle(u, v) <= cost(u, v) on every edge, so the
+    A* heuristic is admissible and consistent for exactly this query.
+    """
+    if not cg.has_coords:
+        return 0.0
+    miles = cg.edge_miles
+    positive = miles > 0
+    if not positive.any():
+        return 0.0
+    return float(np.min(vector[positive] / miles[positive]))
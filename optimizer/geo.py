@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+KM_PER_MILE = 1.609344
+
+
+def haversine_miles(a, b):
+    """Great-circle distance in miles between two (lat, lon) points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(h)))
+
+
+def haversine_miles_array(coords, point):
+    """Great-circle distance in miles from every row of an (n, 2) lat/lon array to one point."""
+    lat1 = np.radians(coords[:, 0])
+    lon1 = np.radians(coords[:, 1])
+    lat2, lon2 = math.radians(point[0]), math.radians(point[1])
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * math.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat, lon, precision=4):
+    """Standard base-32 geohash of a point; precision 4 is a cell of roughly 39 x 20 km."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                bits = bits * 2 + 1
+                lon_range[0] = mid
+            else:
+                bits = bits * 2
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
@@ -0,0 +1,132 @@
+# /optimizer/graph_format.py
+"""
+Compact binary road graph format (.rgraph), read through numpy.memmap.
+
+Layout, little-endian, every section starting on an 8-byte boundary:
+
+    magic       8 bytes   b"RGRAPH1\\0"
+    header      4 x u64   num_nodes, num_edges, names_bytes, reserved
+    fingerprint 40 bytes  sha1 hex of the compiled graph
+    offsets     i64[num_nodes + 1]   CSR row offsets
+    targets     i32[num_edges]
+    weights     f64[num_edges]
+    coords      f64[num_nodes, 2]    lat/lon, NaN when unknown
+    names       names_bytes of UTF-8 city names joined by "\\0"
+
+The arrays are views into one read-only memory map, so loading costs a
+header parse and the name table, and every worker mapping the same file
+shares one page-cache copy of the numeric data. The same bytes can be
+placed in any other buffer, such as a multiprocessing.shared_memory block
+(see optimizer.batch_solver), and read back with unpack_graph.
+
+Convert the built-in graph with:
+    python -m optimizer.graph_format graphs/roads.rgraph
+"""
+
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"RGRAPH1\0"
+_HEADER = struct.Struct("<8s4Q40s")
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def _sections(num_nodes, num_edges, names_bytes):
+    """Byte offset of each section, plus the total file size."""
+    position = _HEADER.size
+    layout = {}
+    for name, size in (
+        ("offsets", 8 * (num_nodes + 1)),
+        ("targets", 4 * num_edges),
+        ("weights", 8 * num_edges),
+        ("coords", 16 * num_nodes),
+        ("names", names_bytes),
+    ):
+        position = _align(position)
+        layout[name] = position
+        position += size
+    return layout, position
+
+
+def pack_graph(cg, weights=None):
+    """
+    Serialize a CompiledGraph into .rgraph bytes.
+
+    weights replaces cg.weights in the output when given (same edge ids).
+    """
+    names = "\0".join(cg.names).encode("utf-8")
+    layout, size = _sections(cg.num_nodes, cg.num_edges, len(names))
+    arrays = {
+        "offsets": np.ascontiguousarray(cg.offsets, dtype="<i8"),
+        "targets": np.ascontiguousarray(cg.targets, dtype="<i4"),
+        "weights": np.ascontiguousarray(cg.weights if weights is None else weights, dtype="<f8"),
+        "coords": np.ascontiguousarray(cg.coords, dtype="<f8"),
+    }
+
+    out = bytearray(size)
+    out[:_HEADER.size] = _HEADER.pack(MAGIC, cg.num_nodes, cg.num_edges, len(names), 0, cg.fingerprint.encode("ascii"))
+    for name, array in arrays.items():
+        out[layout[name]:layout[name] + array.nbytes] = array.tobytes()
+    out[layout["names"]:] = names
+    return bytes(out)
+
+
+def write_graph(cg, path):
+    """Write a CompiledGraph as .rgraph, via a temporary file so readers never see half a file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pack_graph(cg))
+    os.replace(tmp_path, path)
+
+
+def read_graph_arrays(path):
+    """
+    Map an .rgraph file.
+
+    Returns:
+        dict: names (list), offsets, targets, weights, coords (read-only
+        views into the map) and fingerprint (str)
+    """
+    return unpack_graph(np.memmap(path, dtype=np.uint8, mode="r"), path)
+
+
+def unpack_graph(data, source="buffer"):
+    """Parse .rgraph bytes held in a uint8 array; the returned arrays are views into it."""
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{source} is not a road graph file")
+    magic, num_nodes, num_edges, names_bytes, _, fingerprint = _HEADER.unpack(data[:_HEADER.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError(f"{source} is not a road graph file")
+    layout, size = _sections(num_nodes, num_edges, names_bytes)
+    if len(data) < size:
+        raise ValueError(f"{source} is truncated or corrupt")
+
+    def section(name, dtype, count):
+        start = layout[name]
+        return data[start:start + count * np.dtype(dtype).itemsize].view(dtype)
+
+    names = section("names", np.uint8, names_bytes).tobytes().decode("utf-8")
+    return {
+        "names": names.split("\0") if num_nodes else [],
+        "offsets": section("offsets", "<i8", num_nodes + 1),
+        "targets": section("targets", "<i4", num_edges),
+        "weights": section("weights", "<f8", num_edges),
+        "coords": section("coords", "<f8", 2 * num_nodes).reshape(num_nodes, 2),
+        "fingerprint": fingerprint.decode("ascii"),
+    }
+
+
+if __name__ == "__main__":
+    from .compiled_graph import compile_graph
+    from .graph_utils import graph, coordinates
+
+    out = sys.argv[1] if len(sys.argv) > 1 else "roads.rgraph"
+    cg = compile_graph(graph, coordinates)
+    write_graph(cg, out)
+    print(f"Wrote {cg.num_nodes} nodes and {cg.num_edges} edges to {out} ({os.path.getsize(out)} bytes)")
@@ -0,0 +1,119 @@
+# /optimizer/graph_registry.py
+"""
+Load road graphs from files and hot-swap them in.
+
+A reload reads and compiles the new graph off to the side, then publishes
+it with a single reference swap (compiled_graph.set_compiled_graph). Each
+request reads the current graph once and searches that object to the end,
+so requests already in flight finish on the old version while new ones get
+the new one, with no lock on the read path.
+
+Supported formats, chosen by file extension:
+    .json    {"graph": {city: {neighbor: miles}}, "coordinates": {city: [lat, lon]}}
+             or just the {city: {neighbor: miles}} dict
+    .csv     origin,destination,miles rows with a header; coordinates are
+             taken from the graph currently served for known cities
+    .rgraph  memory-mapped binary graph (optimizer.graph_format)
+    .npz     arrays written by save_graph
+"""
+
+import csv
+import datetime
+import json
+import os
+
+import numpy as np
+
+from . import dynamic_graph
+from .compiled_graph import (
+    GRAPH_FILE, CompiledGraph, compile_graph, get_compiled_graph, load_graph_file, set_compiled_graph, swap_lock, warm
+)
+
+_history = [{
+    "version": 1,
+    "source": os.path.abspath(GRAPH_FILE) if GRAPH_FILE else "graph_utils",
+    "loaded_at": datetime.datetime.now().isoformat()
+}]
+
+
+def _known_positions():
+    cg = get_compiled_graph()
+    return {
+        name: (lat, lon)
+        for name, (lat, lon) in zip(cg.names, cg.coords.tolist())
+        if not (np.isnan(lat) or np.isnan(lon))
+    }
+
+
+def read_graph(path):
+    """Parse a graph file into a CompiledGraph (not yet published)."""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".rgraph":
+        return load_graph_file(path)
+
+    if extension == ".npz":
+        with np.load(path, allow_pickle=False) as data:
+            return CompiledGraph(data["names"].tolist(), data["offsets"], data["targets"], data["weights"], data["coords"])
+
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        adjacency = data.get("graph", data)
+        positions = {name: tuple(point) for name, point in data.get("coordinates", {}).items()}
+        return compile_graph(adjacency, {**_known_positions(), **positions})
+
+    if extension == ".csv":
+        adjacency = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                adjacency.setdefault(row["origin"], {})[row["destination"]] = float(row["miles"])
+        return compile_graph(adjacency, _known_positions())
+
+    raise ValueError(f"Unsupported graph file type '{extension}'")
+
+
+def save_graph(cg, path):
+    """Write cg as a .npz that read_graph can load without recompiling."""
+    np.savez(
+        path, names=np.array(cg.names), offsets=cg.offsets, targets=cg.targets,
+        weights=cg.weights, coords=cg.coords
+    )
+
+
+def load_graph(path):
+    """
+    Read, compile and publish the graph in path.
+
+    Road closures and reweights still in force are carried over to the new
+    graph. Raises ValueError (or OSError) and leaves the served graph alone
+    if the file cannot be read.
+
+    Returns:
+        dict: version, fingerprint and size of the graph now being served
+    """
+    cg = read_graph(path)
+    if cg.num_nodes == 0:
+        raise ValueError(f"{path} contains no roads")
+    if (cg.weights <= 0).any() or np.isnan(cg.weights).any():
+        raise ValueError(f"{path} has non-positive or missing road weights")
+    warm(cg)
+
+    with swap_lock:
+        cg = set_compiled_graph(dynamic_graph.rebase(cg))
+        _history.append({"version": cg.version, "source": os.path.abspath(path), "loaded_at": datetime.datetime.now().isoformat()})
+    return graph_info(cg)
+
+
+def graph_info(cg=None):
+    """Version, fingerprint and size of cg (the served graph by default)."""
+    cg = cg or get_compiled_graph()
+    loads = [entry for entry in _history if entry["version"] <= cg.version]
+    return {
+        "version": cg.version,
+        "fingerprint": cg.fingerprint,
+        "nodes": cg.num_nodes,
+        "edges": cg.num_edges,
+        "source": loads[-1]["source"],
+        "loaded_at": loads[-1]["loaded_at"]
+    }
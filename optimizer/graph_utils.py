@@ -99,3 +99,106 @@ graph = {
     "San Juan": {"Miami": 1040, "St. Thomas": 110},
     "St. Thomas": {"San Juan": 110}
 }
+
+# (latitude, longitude) of every node in the graph, used by the A* heuristic.
+# Cities that also appear in the `ports` dict in app.py use the same values.
+coordinates = {
+    # Southeast & South
+    "Atlanta": (33.7490, -84.3880),
+    "Nashville": (36.1627, -86.7816),
+    "Charlotte": (35.2271, -80.8431),
+    "Jacksonville": (30.3322, -81.6557),
+    "Orlando": (28.5383, -81.3792),
+    "Miami": (25.7617, -80.1918),
+    "Tampa": (27.9506, -82.4572),
+    "Birmingham": (33.5186, -86.8104),
+    "New Orleans": (29.9511, -90.0715),
+    "Montgomery": (32.3792, -86.3077),
+    "Mobile": (30.6954, -88.0399),
+    "Tallahassee": (30.4383, -84.2807),
+    "Columbia": (34.0007, -81.0348),
+    "Charleston": (32.7765, -79.9311),
+    "Raleigh": (35.7796, -78.6382),
+
+    # South Central
+    "Memphis": (35.1495, -90.0490),
+    "Dallas": (32.7767, -96.7970),
+    "Houston": (29.7604, -95.3698),
+    "Austin": (30.2672, -97.7431),
+    "San Antonio": (29.4241, -98.4936),
+    "Little Rock": (34.7465, -92.2896),
+    "Oklahoma City": (35.4676, -97.5164),
+
+    # Midwest
+    "Louisville": (38.2527, -85.7585),
+    "Indianapolis": (39.7684, -86.1581),
+    "Chicago": (41.8781, -87.6298),
+    "Columbus": (39.9612, -82.9988),
+    "Detroit": (42.3314, -83.0458),
+    "Cleveland": (41.4993, -81.6944),
+    "Pittsburgh": (40.4406, -79.9959),
+    "St. Louis": (38.6270, -90.1994),
+    "Kansas City": (39.0997, -94.5786),
+    "Omaha": (41.2565, -95.9345),
+    "Minneapolis": (44.9778, -93.2650),
+    "Topeka": (39.0473, -95.6752),
+    "Lincoln": (40.8136, -96.7026),
+    "Des Moines": (41.5868, -93.6250),
+    "Fargo": (46.8772, -96.7898),
+    "Sioux Falls": (43.5446, -96.7311),
+
+    # Northeast
+    "New York": (40.7128, -74.0060),
+    "Philadelphia": (39.9526, -75.1652),
+    "Trenton": (40.2206, -74.7597),
+    "Newark": (40.7357, -74.1724),
+    "Washington D.C.": (38.9072, -77.0369),
+    "Richmond": (37.5407, -77.4360),
+    "Boston": (42.3601, -71.0589),
+    "Providence": (41.8240, -71.4128),
+    "Hartford": (41.7658, -72.6734),
+    "Albany": (42.6526, -73.7562),
+    "Syracuse": (43.0481, -76.1474),
+    "Buffalo": (42.8864, -78.8784),
+
+    # West
+    "Phoenix": (33.4484, -112.0740),
+    "Albuquerque": (35.0844, -106.6504),
+    "Denver": (39.7392, -104.9903),
+    "Cheyenne": (41.1400, -104.8202),
+    "Salt Lake City": (40.7608, -111.8910),
+    "Las Vegas": (36.1699, -115.1398),
+    "Los Angeles": (34.0522, -118.2437),
+    "San Diego": (32.7157, -117.1611),
+    "San Francisco": (37.7749, -122.4194),
+    "Portland": (45.5152, -122.6784),
+    "Seattle": (47.6062, -122.3321),
+    "Tacoma": (47.2529, -122.4443),
+    "Boise": (43.6150, -116.2023),
+    "Billings": (45.7833, -108.5007),
+    "Helena": (46.5891, -112.0391),
+    "Spokane": (47.6588, -117.4260),
+    "Fresno": (36.7378, -119.7871),
+    "Bakersfield": (35.3733, -119.0187),
+    "Sacramento": (38.5816, -121.4944),
+    "Reno": (39.5296, -119.8138),
+
+    # Canada
+    "Windsor": (42.3149, -83.0364),
+    "Toronto": (43.6532, -79.3832),
+    "Montreal": (45.5017, -73.5673),
+    "Ottawa": (45.4215, -75.6972),
+    "Vancouver": (49.2827, -123.1207),
+    "Calgary": (51.0447, -114.0719),
+    "Edmonton": (53.5461, -113.4938),
+    "Quebec City": (46.8139, -71.2080),
+    "Halifax": (44.6488, -63.5752),
+
+    # Islands / Remote
+    "Anchorage": (61.2181, -149.9003),
+    "Fairbanks": (64.8378, -147.7164),
+    "Honolulu": (21.3069, -157.8583),
+    "Hilo": (19.7074, -155.0885),
+    "San Juan": (18.4655, -66.1057),
+    "St. Thomas": (18.3381, -64.8941)
+}
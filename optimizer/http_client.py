@@ -0,0 +1,209 @@
+# /optimizer/http_client.py
+"""
+Shared HTTP client for the traffic and weather providers.
+
+Every provider gets one ProviderClient: a pooled keep-alive session, a
+per-call deadline, a small retry budget, a circuit breaker and a latency
+histogram. When a call fails or the breaker is open, the caller gets the
+last good response for the same request if there is one, otherwise the
+neutral fallback it passed in.
+
+The socket timeouts only bound each connect and each read, and a retry
+repeats them, so the request itself runs on the client's own thread pool
+and the caller waits at most `deadline` seconds of wall-clock time for it,
+retries included. A slow upstream can therefore never hold a Flask worker
+for longer than the deadline; the abandoned request finishes (or times
+out) in the background.
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (2.0, 3.0)  # (connect, read) seconds, per socket operation
+DEFAULT_DEADLINE = 4.0        # wall-clock seconds for a whole call, retries included
+DEFAULT_POOL_SIZE = 32
+DEFAULT_RETRIES = 1
+LAST_GOOD_MAXSIZE = 4096
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; the last bucket counts everything slower."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.total_ms += ms
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self.counts)
+            labels = [f"<={b}ms" for b in self.buckets] + [f">{self.buckets[-1]}ms"]
+            return {
+                "count": count,
+                "mean_ms": round(self.total_ms / count, 2) if count else 0.0,
+                "buckets": dict(zip(labels, self.counts))
+            }
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderClient:
+    """Pooled, deadline-bounded JSON GETs against one upstream provider."""
+
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE,
+                 retries=DEFAULT_RETRIES, breaker=None, deadline=DEFAULT_DEADLINE):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+
+        retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f"{name}-http")
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._last_good[key] = data
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > LAST_GOOD_MAXSIZE:
+                self._last_good.popitem(last=False)
+
+    def _fallback(self, key, fallback):
+        with self._lock:
+            self.fallbacks += 1
+            return self._last_good.get(key, fallback)
+
+    def _fetch(self, url, params, timeout):
+        response = self.session.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_json(self, url, params=None, fallback=None, timeout=None, deadline=None):
+        """
+        GET url and return the decoded JSON body, waiting at most deadline
+        seconds (the client's by default) in total.
+
+        On a timeout, HTTP error, bad body or open breaker, return the last
+        good body for the same url and params, or fallback if there is none.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        if not self.breaker.allow():
+            return self._fallback(key, fallback)
+
+        deadline = deadline or self.deadline
+        start = time.perf_counter()
+        future = self._executor.submit(self._fetch, url, params, timeout or self.timeout)
+        try:
+            data = future.result(timeout=deadline)
+        except Exception as err:
+            if isinstance(err, FutureTimeout):
+                future.cancel()
+                err = f"no response within the {deadline}s deadline"
+            self.latency.observe((time.perf_counter() - start) * 1000)
+            self.breaker.record_failure()
+            with self._lock:
+                self.calls += 1
+                self.failures += 1
+            print(f"[{self.name} provider] request failed: {err}")
+            return self._fallback(key, fallback)
+
+        self.latency.observe((time.perf_counter() - start) * 1000)
+        self.breaker.record_success()
+        with self._lock:
+            self.calls += 1
+        self._remember(key, data)
+        return data
+
+    def metrics(self):
+        with self._lock:
+            counters = {"calls": self.calls, "failures": self.failures, "fallbacks": self.fallbacks}
+        counters["breaker"] = self.breaker.state
+        counters["latency"] = self.latency.snapshot()
+        return counters
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """Return the process-wide client for a provider, creating it on first use."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = ProviderClient(name, **options)
+        return _clients[name]
+
+
+def provider_metrics():
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: client.metrics() for client in clients}
@@ -0,0 +1,194 @@
+# /optimizer/multi_stop.py
+"""
+Multi-stop route sequencing.
+
+The stop-to-stop cost matrix comes from one one-to-many search per stop on
+the query's weights, and the parent pointers from those searches stitch the
+chosen order back into a road path. The visiting order is solved exactly
+with Held-Karp (vectorized over all subsets of each size) up to EXACT_MAX_STOPS free
+stops, and beyond that with nearest-neighbour construction improved by
+2-opt and Or-opt moves until neither finds a gain. Costs may be asymmetric,
+so every move is priced on the real matrix rather than assuming reversal
+is free.
+"""
+
+import numpy as np
+
+from .compiled_graph import get_compiled_graph
+from .dijkstra import INF, build_path, one_to_many
+from .edge_weights import build_weight_vector
+
+EXACT_MAX_STOPS = 15
+
+
+def _order_cost(matrix, start, order, end):
+    cost = 0.0
+    previous = start
+    for node in order:
+        cost += matrix[previous, node]
+        previous = node
+    if end is not None:
+        cost += matrix[previous, end]
+    return cost
+
+
+def held_karp(matrix, start, free, end=None):
+    """
+    Exact cheapest order to visit every index in free, starting at start and
+    finishing at end (or anywhere when end is None).
+
+    Returns:
+        tuple: (cost, order of free indices)
+    """
+    n = len(free)
+    if n == 0:
+        return _order_cost(matrix, start, [], end), []
+    sub = matrix[np.ix_(free, free)]
+    full = (1 << n) - 1
+
+    # dp[mask, j]: cheapest start -> (visit mask) ending at free[j]
+    dp = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int64)
+    for j in range(n):
+        dp[1 << j, j] = matrix[start, free[j]]
+
+    # Extend every subset of one size at once: each (subset + k, k) entry has
+    # exactly one predecessor subset, so the scatter below never collides.
+    bits = 1 << np.arange(n)
+    masks = np.arange(1 << n)
+    sizes = np.array([bin(mask).count("1") for mask in range(1 << n)])
+    for size in range(1, n):
+        layer = masks[sizes == size]
+        candidates = dp[layer][:, :, None] + sub[None, :, :]
+        best_j = candidates.argmin(axis=1)
+        best = np.take_along_axis(candidates, best_j[:, None, :], axis=1)[:, 0, :]
+        rows, ks = np.nonzero((layer[:, None] & bits[None, :]) == 0)
+        targets = layer[rows] | bits[ks]
+        dp[targets, ks] = best[rows, ks]
+        parent[targets, ks] = best_j[rows, ks]
+
+    final = dp[full] + (matrix[free, end] if end is not None else 0.0)
+    last = int(final.argmin())
+    cost = float(final[last])
+
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(free[last])
+        last, mask = int(parent[mask, last]), mask & ~(1 << last)
+    order.reverse()
+    return cost, order
+
+
+def local_search(matrix, start, free, end=None):
+    """
+    Nearest-neighbour order improved with 2-opt and Or-opt moves.
+
+    Returns:
+        tuple: (cost, order of free indices)
+    """
+    remaining = list(free)
+    order = []
+    current = start
+    while remaining:
+        nearest = min(remaining, key=lambda node: matrix[current, node])
+        order.append(nearest)
+        remaining.remove(nearest)
+        current = nearest
+
+    cost = _order_cost(matrix, start, order, end)
+    improved = True
+    while improved:
+        improved = False
+        n = len(order)
+
+        # 2-opt: reverse order[i:j]
+        for i in range(n - 1):
+            for j in range(i + 2, n + 1):
+                candidate = order[:i] + order[i:j][::-1] + order[j:]
+                candidate_cost = _order_cost(matrix, start, candidate, end)
+                if candidate_cost < cost - 1e-9:
+                    order, cost, improved = candidate, candidate_cost, True
+
+        # Or-opt: move a run of 1-3 stops to another position
+        for length in (1, 2, 3):
+            for i in range(n - length + 1):
+                segment = order[i:i + length]
+                rest = order[:i] + order[i + length:]
+                for j in range(len(rest) + 1):
+                    if j == i:
+                        continue
+                    candidate = rest[:j] + segment + rest[j:]
+                    candidate_cost = _order_cost(matrix, start, candidate, end)
+                    if candidate_cost < cost - 1e-9:
+                        order, cost, improved = candidate, candidate_cost, True
+                        break
+                else:
+                    continue
+                break
+
+    return cost, order
+
+
+def plan_stops(start, stops, weather, cargo, end=None, round_trip=False, node_weather=None):
+    """
+    Cheapest order to visit every stop, stitched into one road route.
+
+    Params:
+        start (str): city the run starts from
+        stops (list): cities to visit, in any order
+        weather (str), cargo (str): as for optimize_route
+        end (str): optional city the run must finish at
+        round_trip (bool): finish back at start (overrides end)
+        node_weather (NodeWeather): optional per-node grid weather, as for optimize_route
+
+    Returns:
+        dict: route, total_distance, stop_order, legs and the solver used
+    """
+    cg = get_compiled_graph()
+    if round_trip:
+        end = start
+    cities = [start] + [city for city in dict.fromkeys(stops) if city not in (start, end)]
+    if end is not None and end != start:
+        cities.append(end)
+    unknown = [city for city in cities if city not in cg.index]
+    if unknown:
+        return {"route": [], "total_distance": INF, "error": f"Invalid city name: {', '.join(unknown)}"}
+
+    nodes = [cg.index[city] for city in cities]
+    weights = build_weight_vector(cg, weather, cargo, node_weather=node_weather).tolist()
+    matrix = np.empty((len(nodes), len(nodes)))
+    parents = []
+    for i, source in enumerate(nodes):
+        dist, parent_edge = one_to_many(cg, source, nodes, weights)
+        matrix[i] = [dist[node] for node in nodes]
+        parents.append(parent_edge)
+
+    end_index = None if end is None else (0 if end == start else len(cities) - 1)
+    free = [i for i in range(1, len(cities)) if i != end_index]
+    if len(free) <= EXACT_MAX_STOPS:
+        cost, order = held_karp(matrix, 0, free, end_index)
+        solver = "held_karp"
+    else:
+        cost, order = local_search(matrix, 0, free, end_index)
+        solver = "2opt_oropt"
+
+    if cost == INF:
+        return {"route": [], "total_distance": INF, "error": "No path found", "graph_version": cg.version}
+
+    sequence = [0] + order + ([end_index] if end_index is not None else [])
+    route = [nodes[0]]
+    legs = []
+    for a, b in zip(sequence, sequence[1:]):
+        leg = build_path(cg, parents[a], nodes[b])
+        route.extend(leg[1:])
+        legs.append({"from": cities[a], "to": cities[b], "route": cg.path_names(leg), "distance": round(matrix[a, b], 2)})
+
+    return {
+        "route": cg.path_names(route),
+        "total_distance": round(cost, 2),
+        "stop_order": [cities[i] for i in sequence],
+        "legs": legs,
+        "solver": solver,
+        "graph_version": cg.version
+    }
@@ -1,7 +1,36 @@
-from .graph_utils import graph
-from .dijkstra import dijkstra
+import datetime
 
-def optimize_route(origin, destination, weather, traffic, cargo):
+from .compiled_graph import get_compiled_graph
+from .dijkstra import INF, build_path, condition_factors, one_to_many, route_result, shortest_path
+from .edge_weights import build_weight_vector, heuristic_scale
+from .astar import astar_path
+from .bidirectional import bidirectional_path
+from .contraction import get_hierarchy, hierarchy_path
+from .all_pairs import get_table, table_path
+from .yen import k_shortest_paths
+from .route_cache import route_cache, route_key
+from .time_dependent import time_dependent_path
+
+def _precomputed_result(cg, cost, path, expanded, weather, cargo, algorithm):
+    """Scale a base-weight answer by the query's uniform weather and cargo factors."""
+    w_factor, c_factor = condition_factors(weather, cargo)
+    result = route_result(cg, cost * w_factor * c_factor, path, expanded)
+    result["algorithm"] = algorithm
+    return result
+
+ALGORITHMS = ("astar", "dijkstra", "bidirectional", "ch", "table")
+
+# (algorithm, graph fingerprint) pairs whose Dijkstra fallback has been logged
+_fallback_logged = set()
+
+
+def _log_fallback(cg, algorithm, message):
+    if (algorithm, cg.fingerprint) not in _fallback_logged:
+        _fallback_logged.add((algorithm, cg.fingerprint))
+        print(f"[Optimizer] {message}, falling back to Dijkstra")
+
+def optimize_route(origin, destination, weather, traffic, cargo, algorithm="astar", k=1,
+                   departure_time=None, node_weather=None, use_cache=True):
     """
     Real implementation using Dijkstra algorithm and weighted graph.
 
@@ -11,18 +40,189 @@ def optimize_route(origin, destination, weather, traffic, cargo):
         weather (str): Weather condition (e.g., 'Clear skies', 'Stormy')
         traffic (str): Traffic level (e.g., 'low', 'medium', 'high')
         cargo (str): Cargo type (e.g., 'general', 'fragile', 'hazmat')
+        algorithm (str): one of
+            'astar' - great-circle heuristic (default)
+            'dijkstra' - plain Dijkstra
+            'bidirectional' - searches from both ends
+            'ch' - precomputed contraction hierarchy on base weights, falls
+                back to 'dijkstra' when it is missing or stale
+            'table' - all-pairs next-hop table on base weights, runs as
+                'dijkstra' while the table is built in the background
+        k (int): when above 1, also return up to k loopless routes (Yen's
+            algorithm on live weights) under 'routes'; algorithm is ignored
+        departure_time (datetime): when set, route on the hourly traffic
+            layers for that departure and report the arrival time;
+            algorithm and k are ignored
+        node_weather (NodeWeather): optional per-node grid weather; an edge
+            then gets the worse factor of its two endpoints, and `weather`
+            only applies to nodes without a report. 'ch' and 'table' assume
+            uniform weather, so they run as 'dijkstra' in this case
+        use_cache (bool): serve and store the result in the route cache
 
     Returns:
-        dict: Contains route path, total adjusted distance, and factors used
+        dict: Contains route path, total adjusted distance, and factors used,
+        plus the version of the graph it was computed on; 'fallback_from'
+        names the requested algorithm when another one answered instead
     """
+    # One graph for the whole request, even if a new version is published meanwhile
+    cg = get_compiled_graph()
+    if not use_cache:
+        result = _compute_route(cg, origin, destination, weather, cargo, algorithm, k, departure_time, node_weather)
+        result["graph_version"] = cg.version
+        return result
+
+    key = route_key(
+        origin, destination, weather, cargo, cg.fingerprint, algorithm=algorithm, k=k,
+        departure_time=departure_time.isoformat() if departure_time else None,
+        node_weather=node_weather.version if node_weather is not None else None
+    )
+    result = route_cache.get(key)
+    if result is not None:
+        result["cached"] = True
+        result["graph_version"] = cg.version
+        return result
+
+    result = _compute_route(cg, origin, destination, weather, cargo, algorithm, k, departure_time, node_weather)
+    # A fallback answer is not cached, so the fast path serves once it is ready
+    if "error" not in result and "fallback_from" not in result:
+        route_cache.put(key, result)
+    result["cached"] = False
+    result["graph_version"] = cg.version
+    return result
+
 
-    if origin not in graph or destination not in graph:
+def _compute_route(cg, origin, destination, weather, cargo, algorithm, k, departure_time, node_weather):
+    """optimize_route without the cache."""
+    if origin not in cg.index or destination not in cg.index:
         return {
             "route": [],
             "total_distance": float("inf"),
             "error": "Invalid city name"
         }
 
-    result = dijkstra(graph, origin, destination, weather, traffic, cargo)
+    if algorithm not in ALGORITHMS:
+        return {
+            "route": [],
+            "total_distance": float("inf"),
+            "error": f"Unknown algorithm '{algorithm}'"
+        }
+
+    source, target = cg.index[origin], cg.index[destination]
+    requested = algorithm
+
+    if departure_time is not None:
+        departure_hour = departure_time.hour + departure_time.minute / 60
+        weights = build_weight_vector(cg, weather, cargo, node_weather=node_weather, traffic=False)
+        cost, hours, path, expanded = time_dependent_path(cg, source, target, departure_hour, weights.tolist())
+        result = route_result(cg, cost, path, expanded)
+        result["algorithm"] = "time_dependent"
+        result["departure_time"] = departure_time.isoformat()
+        if path:
+            result["travel_hours"] = round(hours, 2)
+            result["arrival_time"] = (departure_time + datetime.timedelta(hours=hours)).isoformat()
+        return result
+
+    vector = build_weight_vector(cg, weather, cargo, node_weather=node_weather)
+    weights = vector.tolist()
+
+    if k > 1:
+        routes = k_shortest_paths(cg, source, target, weights, k)
+        cost, path = routes[0] if routes else (INF, [])
+        result = route_result(cg, cost, path)
+        result["routes"] = [
+            {"route": cg.path_names(path), "total_distance": round(cost, 2)}
+            for cost, path in routes
+        ]
+        result["algorithm"] = "yen"
+        return result
+
+    if node_weather is not None and algorithm in ("ch", "table"):
+        algorithm = "dijkstra"
+
+    if algorithm == "table":
+        table = get_table(cg)
+        if table is not None:
+            cost, path, expanded = table_path(table, source, target)
+            return _precomputed_result(cg, cost, path, expanded, weather, cargo, algorithm)
+        _log_fallback(cg, algorithm, "All-pairs table still building")
+        algorithm = "dijkstra"
+
+    if algorithm == "ch":
+        ch = get_hierarchy(cg)
+        if ch is not None:
+            cost, path, expanded = hierarchy_path(ch, source, target)
+            return _precomputed_result(cg, cost, path, expanded, weather, cargo, algorithm)
+        _log_fallback(cg, algorithm, "Contraction hierarchy missing or stale")
+        algorithm = "dijkstra"
+
+    if algorithm == "astar":
+        scale = heuristic_scale(cg, vector)
+        cost, path, expanded = astar_path(cg, source, target, weights, scale)
+    elif algorithm == "bidirectional":
+        cost, path, expanded = bidirectional_path(cg, source, target, weights)
+    else:
+        cost, path, expanded = shortest_path(cg, source, target, weights)
+
+    result = route_result(cg, cost, path, expanded)
+    result["algorithm"] = algorithm
+    if algorithm != requested:
+        result["fallback_from"] = requested
     return result
 
+
+def optimize_routes(queries, node_weather=None):
+    """
+    Optimize many routes at once with one search per distinct origin.
+
+    Weather and cargo multiply every edge of a query equally, so all queries
+    from the same origin share one one-to-many search on base weights and
+    traffic, and each result is scaled by its own factors afterwards. With
+    node_weather (grid weather per node, shared by the whole batch) the weather
+    goes into the shared weights instead and only cargo is scaled per query.
+
+    Params:
+        queries (list): dicts with 'origin', 'destination', 'weather' and 'cargo'
+        node_weather (NodeWeather): optional per-node weather for the whole batch
+
+    Returns:
+        list: one result dict per query, in input order
+    """
+    cg = get_compiled_graph()
+    results = [None] * len(queries)
+    by_origin = {}
+
+    for i, query in enumerate(queries):
+        origin, destination = query["origin"], query["destination"]
+        if origin not in cg.index or destination not in cg.index:
+            results[i] = {
+                "route": [],
+                "total_distance": INF,
+                "error": "Invalid city name"
+            }
+            continue
+        by_origin.setdefault(cg.index[origin], []).append(i)
+
+    # Base weight x traffic (x per-node weather), shared by every search in the batch.
+    if node_weather is not None:
+        weights = build_weight_vector(cg, "Clear skies", node_weather=node_weather).tolist()
+    else:
+        weights = build_weight_vector(cg).tolist()
+
+    for source, members in by_origin.items():
+        wanted = {cg.index[queries[i]["destination"]] for i in members}
+        dist, parent_edge = one_to_many(cg, source, wanted, weights)
+        for i in members:
+            query = queries[i]
+            target = cg.index[query["destination"]]
+            if dist[target] == INF:
+                results[i] = route_result(cg, INF, [])
+                continue
+            w_factor, c_factor = condition_factors(query["weather"], query["cargo"])
+            if node_weather is not None:
+                w_factor = 1.0
+            path = build_path(cg, parent_edge, target)
+            results[i] = route_result(cg, dist[target] * w_factor * c_factor, path)
+
+    for result in results:
+        result["graph_version"] = cg.version
+    return results
@@ -0,0 +1,86 @@
+# /optimizer/reachability.py
+"""
+Which cities a truck can reach from a hub within a time budget.
+
+One bounded Dijkstra on base x traffic weights answers a hub for every
+city at once: it stops at the first city beyond budget x speed. Road
+weights are miles and shipping speeds km/h, so the budget is converted to
+miles first. Budgets
+are rounded up to a whole bucket before searching and the result is cached
+per (hub, speed, bucket), so requests for 7.2 and 7.9 hours share one
+search and are each filtered down to their exact budget.
+"""
+
+import datetime
+import math
+
+from .compiled_graph import get_compiled_graph
+from .dijkstra import bounded_search
+from .edge_weights import build_weight_vector
+from .geo import KM_PER_MILE
+from .route_cache import RouteCache, traffic_version
+
+DEFAULT_BUCKET_HOURS = 1.0
+
+reachability_cache = RouteCache()
+
+
+def _reachable(cg, source, speed_kmh, bucket_hours):
+    """(city, road miles, traffic-adjusted miles, hours) within bucket_hours of source, nearest first; cached."""
+    key = (source, speed_kmh, bucket_hours, traffic_version(), cg.fingerprint)
+    entry = reachability_cache.get(key)
+    if entry is not None:
+        return entry["cities"]
+
+    mph = speed_kmh / KM_PER_MILE
+    weights = build_weight_vector(cg).tolist()
+    settled, dist, parent_edge = bounded_search(cg, source, weights, bucket_hours * mph)
+
+    # Untrafficked road miles along each search-tree path
+    sources, base = cg.sources_list, cg.weights_list
+    miles = {source: 0.0}
+    for node in settled[1:]:
+        e = parent_edge[node]
+        miles[node] = miles[sources[e]] + base[e]
+
+    cities = [(cg.names[node], miles[node], dist[node], dist[node] / mph) for node in settled]
+    reachability_cache.put(key, {"cities": cities})
+    return cities
+
+
+def reachable_cities(hub, speed_kmh, hours, departure_time=None, bucket=DEFAULT_BUCKET_HOURS):
+    """
+    Cities reachable from hub within hours at the given road speed.
+
+    Params:
+        hub (str): starting city
+        speed_kmh (float): road speed in km/h, as in SHIPPING_SPEEDS
+        hours (float): time budget
+        departure_time (datetime): when set, each city also gets an arrival_time
+        bucket (float): cache granularity in hours
+
+    Returns:
+        list: {"city", "distance" (road miles), "travel_cost" (traffic-adjusted
+        miles), "travel_hours"[, "arrival_time"]} dicts sorted by travel time,
+        or None if hub is not in the graph
+    """
+    cg = get_compiled_graph()
+    source = cg.index.get(hub)
+    if source is None:
+        return None
+
+    bucket_hours = max(math.ceil(hours / bucket), 1) * bucket
+    reachable = []
+    for city, miles, cost, travel_hours in _reachable(cg, source, speed_kmh, bucket_hours):
+        if travel_hours > hours:
+            break
+        entry = {
+            "city": city,
+            "distance": round(miles, 2),
+            "travel_cost": round(cost, 2),
+            "travel_hours": round(travel_hours, 2)
+        }
+        if departure_time is not None:
+            entry["arrival_time"] = (departure_time + datetime.timedelta(hours=travel_hours)).isoformat()
+        reachable.append(entry)
+    return reachable
@@ -0,0 +1,100 @@
+# /optimizer/route_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from .factors import weather_factor, cargo_factor
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL_SECONDS = 300
+
+
+class RouteCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL for optimize_route results.
+
+    Entries are copied on the way in and out, because callers add their own
+    keys (weather details, map state) to the dicts they get back.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+route_cache = RouteCache()
+
+# Bumped whenever traffic conditions are known to have changed; part of
+# every key, so results computed under older traffic are never served.
+_traffic_version = 0
+
+
+def traffic_version():
+    return _traffic_version
+
+
+def notify_traffic_changed():
+    """Start a new traffic version and drop every cached route."""
+    global _traffic_version
+    _traffic_version += 1
+    route_cache.invalidate()
+
+
+def route_key(origin, destination, weather, cargo, fingerprint, **options):
+    """
+    Normalize a query into a cache key.
+
+    Weather and cargo only enter the cost through their factors, so 'Heavy
+    rain' and 'Light rain' (same factor) share an entry. The graph
+    fingerprint keeps results from an older graph from ever matching.
+    """
+    return (
+        origin,
+        destination,
+        weather_factor(weather),
+        cargo_factor(cargo),
+        _traffic_version,
+        fingerprint,
+        tuple(sorted(options.items()))
+    )
@@ -0,0 +1,114 @@
+# /optimizer/time_dependent.py
+"""
+Time-dependent routing on hourly traffic layers.
+
+build_hourly_factors() evaluates the rush-hour model in factors.py once per
+(hour, edge) into a 24 x E matrix. The search then looks an edge's factor up
+by the hour the truck reaches the edge's tail, so no Python factor function
+runs at query time. Factors are constant within an hour, so a route that
+waits for rush hour to pass is not considered.
+"""
+
+import heapq
+import threading
+
+import numpy as np
+
+from .dijkstra import INF, build_path
+from .factors import hourly_base_factor, pair_jitter
+
+HOURS = 24
+DEFAULT_SPEED_MPH = 50
+
+
+def build_hourly_factors(cg):
+    """24 x E matrix: row h holds every edge's traffic factor for departures in hour h."""
+    names = cg.names
+    jitter = np.array(
+        [pair_jitter(names[u], names[v]) for u, v in zip(cg.sources_list, cg.targets_list)],
+        dtype=np.float64
+    )
+    # Only a handful of distinct jitters exist, so round each (hour, jitter)
+    # combination exactly as traffic_factor does and gather per edge.
+    distinct, per_edge = np.unique(jitter, return_inverse=True)
+    table = np.array(
+        [[round(hourly_base_factor(hour) + j, 2) for j in distinct.tolist()] for hour in range(HOURS)],
+        dtype=np.float64
+    ).reshape(HOURS, len(distinct))
+    return table[:, per_edge.ravel()]
+
+
+class HourlyLayers:
+    def __init__(self, fingerprint, factors):
+        self.fingerprint = fingerprint
+        self.factors = factors
+        self.rows = factors.tolist()
+
+
+_layers = None
+_lock = threading.Lock()
+
+
+def get_hourly_layers(cg):
+    """Hourly layers for cg, built once per graph."""
+    global _layers
+    layers = _layers
+    if layers is not None and layers.fingerprint == cg.topology_fingerprint:
+        return layers
+    with _lock:
+        if _layers is None or _layers.fingerprint != cg.topology_fingerprint:
+            _layers = HourlyLayers(cg.topology_fingerprint, build_hourly_factors(cg))
+        return _layers
+
+
+def time_dependent_path(cg, source, target, departure_hour, weights, speed=DEFAULT_SPEED_MPH):
+    """
+    Earliest-arrival Dijkstra where each edge's traffic factor depends on
+    the hour the truck reaches its tail.
+
+    Params:
+        departure_hour (float): hour of day at departure, e.g. 8.5 for 08:30
+        weights (list): per-edge cost before traffic (base x weather x cargo)
+        speed (float): road speed in miles per hour used to advance the clock
+
+    Returns:
+        tuple: (adjusted cost, hours en route, path as node ids, nodes expanded)
+    """
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    rows = get_hourly_layers(cg).rows
+    n = cg.num_nodes
+
+    hours = [INF] * n
+    cost = [INF] * n
+    parent_edge = [-1] * n
+    settled = bytearray(n)
+    hours[source] = 0.0
+    cost[source] = 0.0
+    queue = [(0.0, source)]
+    expanded = 0
+
+    while queue:
+        elapsed, node = heapq.heappop(queue)
+        if settled[node]:
+            continue
+        settled[node] = 1
+        expanded += 1
+
+        if node == target:
+            return cost[node], elapsed, build_path(cg, parent_edge, target), expanded
+
+        layer = rows[int(departure_hour + elapsed) % HOURS]
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if settled[neighbor]:
+                continue
+            edge_cost = weights[e] * layer[e]
+            arrival = elapsed + edge_cost / speed
+            if arrival < hours[neighbor]:
+                hours[neighbor] = arrival
+                cost[neighbor] = cost[node] + edge_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (arrival, neighbor))
+
+    return INF, INF, [], expanded
@@ -0,0 +1,211 @@
+# /optimizer/traffic_snapshot.py
+"""
+Per-edge traffic factors, fetched for the whole graph in the background.
+
+Searches never call a traffic API: they read snapshot.factors_list[e], an
+O(1) list lookup aligned with the compiled graph's edge ids. A refresh
+fetches every edge concurrently on a thread pool and swaps the new
+snapshot in with a single assignment, so in-flight searches keep the one
+they started with.
+
+Live Directions API traffic is opt-in (LIVE_TRAFFIC=1 plus GOOGLE_API_KEY)
+because every pass costs one billable call per edge. Only one process
+refreshes: whichever holds the lock next to SNAPSHOT_FILE fetches and
+writes the snapshot there, and every other process (e.g. the remaining
+gunicorn workers) reloads that file when it changes. A dedicated refresher
+can hold the lock instead of a web worker:
+    LIVE_TRAFFIC=1 python -m optimizer.traffic_snapshot
+"""
+
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process refreshes on its own
+    fcntl = None
+
+from . import traffic_api
+from .factors import traffic_factor, MIN_TRAFFIC_FACTOR
+from .route_cache import notify_traffic_changed
+
+LIVE_TRAFFIC = os.environ.get("LIVE_TRAFFIC", "").lower() in ("1", "true", "yes")
+DEFAULT_REFRESH_SECONDS = float(os.environ.get("TRAFFIC_REFRESH_SECONDS", 300))
+DEFAULT_WORKERS = 16
+FOLLOW_SECONDS = 15  # how often non-refreshing processes check SNAPSHOT_FILE
+SNAPSHOT_FILE = os.environ.get("TRAFFIC_SNAPSHOT_FILE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "traffic_snapshot.npz"
+)
+
+
+class LiveTrafficProvider:
+    """Directions API traffic ratios via optimizer.traffic_api."""
+
+    name = "live"
+
+    def edge_factor(self, origin, destination):
+        return traffic_api.get_live_traffic_factor(origin, destination)
+
+
+class StubTrafficProvider:
+    """Offline provider: the rush-hour model in factors.traffic_factor, no network."""
+
+    name = "stub"
+
+    def __init__(self, hour=None):
+        self.hour = hour
+
+    def edge_factor(self, origin, destination):
+        hour = self.hour if self.hour is not None else datetime.datetime.now().hour
+        return traffic_factor(origin, destination, hour)
+
+
+def default_provider():
+    """Live traffic when LIVE_TRAFFIC is set and an API key is configured, otherwise the offline stub."""
+    return LiveTrafficProvider() if LIVE_TRAFFIC and traffic_api.GOOGLE_API_KEY else StubTrafficProvider()
+
+
+class TrafficSnapshot:
+    """Traffic factor for every edge of one compiled graph."""
+
+    def __init__(self, version, fingerprint, factors, provider, fetched_at):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.factors = factors
+        self.factors_list = factors.tolist()
+        self.provider = provider
+        self.fetched_at = fetched_at
+
+
+def neutral_snapshot(cg):
+    """All-1.0 factors, used until the first refresh for a graph completes."""
+    return TrafficSnapshot(0, cg.topology_fingerprint, np.ones(cg.num_edges), "neutral", None)
+
+
+_current = None
+_refresh_lock = threading.Lock()
+
+
+def get_snapshot(cg):
+    """Current snapshot for cg; neutral if none has been fetched for this graph yet."""
+    snapshot = _current
+    if snapshot is None or snapshot.fingerprint != cg.topology_fingerprint:
+        return neutral_snapshot(cg)
+    return snapshot
+
+
+def _fetch_one(provider, origin, destination):
+    try:
+        return max(float(provider.edge_factor(origin, destination)), MIN_TRAFFIC_FACTOR)
+    except Exception as err:
+        print(f"[Traffic API error] {origin} → {destination}: {err}")
+        return 1.0
+
+
+def refresh_snapshot(cg, provider=None, max_workers=DEFAULT_WORKERS):
+    """
+    Fetch traffic for every edge of cg concurrently and publish the result.
+
+    Returns:
+        TrafficSnapshot: the snapshot now being served
+    """
+    global _current
+    provider = provider or default_provider()
+    names = cg.names
+    pairs = [(names[u], names[v]) for u, v in zip(cg.sources_list, cg.targets_list)]
+
+    with _refresh_lock:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            factors = list(pool.map(lambda pair: _fetch_one(provider, *pair), pairs))
+        previous = _current.version if _current is not None else 0
+        _current = TrafficSnapshot(
+            previous + 1, cg.topology_fingerprint, np.asarray(factors, dtype=np.float64),
+            provider.name, datetime.datetime.now()
+        )
+        notify_traffic_changed()
+        return _current
+
+
+def save_snapshot(snapshot, path=SNAPSHOT_FILE):
+    """Write a snapshot for other processes, via a temporary file so readers never see half of one."""
+    tmp_path = path + ".tmp.npz"
+    np.savez(
+        tmp_path, factors=snapshot.factors, fingerprint=snapshot.fingerprint,
+        provider=snapshot.provider, fetched_at=snapshot.fetched_at.isoformat()
+    )
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """Publish the snapshot another process saved to path."""
+    global _current
+    with np.load(path, allow_pickle=False) as data:
+        factors = data["factors"]
+        fingerprint, provider, fetched_at = (str(data[key]) for key in ("fingerprint", "provider", "fetched_at"))
+    with _refresh_lock:
+        previous = _current.version if _current is not None else 0
+        _current = TrafficSnapshot(
+            previous + 1, fingerprint, factors, provider, datetime.datetime.fromisoformat(fetched_at)
+        )
+        notify_traffic_changed()
+        return _current
+
+
+_lock_files = []  # kept open: closing the file would release the lock
+
+
+def _acquire_refresher_lock(path):
+    """True if this process is (now) the one that refreshes; held until it exits."""
+    if fcntl is None:
+        return True
+    handle = open(path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _lock_files.append(handle)
+    return True
+
+
+def start_background_refresh(get_graph, provider=None, interval=DEFAULT_REFRESH_SECONDS, snapshot_file=SNAPSHOT_FILE):
+    """
+    Keep the snapshot current on a daemon thread.
+
+    The process holding the refresher lock fetches now and then every
+    interval seconds and saves to snapshot_file; the others reload that
+    file when it changes, and take over the lock if its holder exits.
+    get_graph is called on each pass so a reloaded graph is picked up.
+    """
+    def loop():
+        refresher = False
+        loaded_mtime = None
+        while True:
+            try:
+                refresher = refresher or _acquire_refresher_lock(snapshot_file + ".lock")
+                if refresher:
+                    save_snapshot(refresh_snapshot(get_graph(), provider), snapshot_file)
+                else:
+                    mtime = os.stat(snapshot_file).st_mtime_ns if os.path.exists(snapshot_file) else None
+                    if mtime is not None and mtime != loaded_mtime:
+                        load_snapshot(snapshot_file)
+                        loaded_mtime = mtime
+            except Exception as err:
+                print(f"[Traffic snapshot] refresh failed: {err}")
+            time.sleep(interval if refresher else min(interval, FOLLOW_SECONDS))
+
+    thread = threading.Thread(target=loop, name="traffic-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from .compiled_graph import get_compiled_graph
+
+    print(f"Refreshing {default_provider().name} traffic every {DEFAULT_REFRESH_SECONDS:.0f}s into {SNAPSHOT_FILE}")
+    start_background_refresh(get_compiled_graph).join()
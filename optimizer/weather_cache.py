@@ -0,0 +1,140 @@
+# /optimizer/weather_cache.py
+"""
+Single-flight TTL cache for point weather lookups.
+
+Keys are coordinates rounded to a couple of decimals (about 1 km), so
+nearby points share an entry. A fresh entry is served directly. A stale
+entry is still served while one background thread fetches its
+replacement. A missing entry is fetched by exactly one caller, and every
+concurrent caller for the same key waits for that one upstream call
+instead of making its own.
+"""
+
+import threading
+import time
+
+from .http_client import LatencyHistogram
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_STALE_SECONDS = 1800
+DEFAULT_PRECISION = 2
+DEFAULT_WAIT_SECONDS = 10.0
+
+
+class _Flight:
+    """One in-progress upstream fetch that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class WeatherCache:
+    """
+    Params:
+        fetch (callable): fetch(lat, lon) -> weather dict, or None on failure
+        ttl (float): seconds an entry is served without refreshing
+        stale_ttl (float): further seconds a stale entry is served while it refreshes
+        precision (int): decimals kept when rounding coordinates into a key
+    """
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL_SECONDS, stale_ttl=DEFAULT_STALE_SECONDS,
+                 precision=DEFAULT_PRECISION):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+        self.latency = LatencyHistogram()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_failures = 0
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def key(self, lat, lon):
+        return (round(lat, self.precision), round(lon, self.precision))
+
+    def _fetch(self, key, lat, lon, flight):
+        start = time.perf_counter()
+        try:
+            result = self.fetch(lat, lon)
+        except Exception as err:
+            print(f"[Weather cache] fetch failed for {key}: {err}")
+            result = None
+        self.latency.observe((time.perf_counter() - start) * 1000)
+
+        with self._lock:
+            self.upstream_calls += 1
+            if result is None:
+                self.upstream_failures += 1
+                # Keep serving the old report rather than forgetting it
+                entry = self._entries.get(key)
+                result = entry[1] if entry is not None else None
+            else:
+                self._entries[key] = (time.monotonic(), result)
+            del self._flights[key]
+        flight.result = result
+        flight.done.set()
+        return result
+
+    def get(self, lat, lon):
+        """Weather for a point: cached, stale-while-refreshing, or fetched once for all callers."""
+        key = self.key(lat, lon)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[0] if entry is not None else None
+            if age is not None and age < self.ttl:
+                self.hits += 1
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+            if age is not None and age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if leader:
+                    threading.Thread(
+                        target=self._fetch, args=(key, lat, lon, flight),
+                        name="weather-cache-refresh", daemon=True
+                    ).start()
+                return entry[1]
+
+            if leader:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            return self._fetch(key, lat, lon, flight)
+        flight.done.wait(DEFAULT_WAIT_SECONDS)
+        return flight.result
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            served = self.hits + self.stale_hits
+            counters = {
+                "size": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "stale_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "upstream_calls": self.upstream_calls,
+                "upstream_failures": self.upstream_failures
+            }
+        counters["upstream_latency"] = self.latency.snapshot()
+        return counters
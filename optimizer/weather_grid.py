@@ -0,0 +1,143 @@
+# /optimizer/weather_grid.py
+"""
+Regional weather keyed by geohash cell.
+
+One background pass fetches conditions for every registered point (ports
+and graph nodes) in a single batch and publishes a new cell map with one
+reference swap. Lookups never touch the network: a point maps to its cell
+and the cell to its conditions. Each graph node's cell is computed once per
+graph, and its weather factor once per refresh, as a NumPy array tagged
+with the grid version that route cache keys can use.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .factors import weather_factor
+from .geo import geohash
+
+GRID_PRECISION = 4
+DEFAULT_REFRESH_SECONDS = 600
+DEFAULT_WORKERS = 16
+
+
+class PointWeatherProvider:
+    """Adapts a per-point lookup(lat, lon) -> weather dict into a concurrent batch fetch."""
+
+    name = "point"
+
+    def __init__(self, lookup, max_workers=DEFAULT_WORKERS):
+        self.lookup = lookup
+        self.max_workers = max_workers
+
+    def fetch_batch(self, points):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda point: self.lookup(*point), points))
+
+
+class NodeWeather:
+    """Weather factor per node of one graph from one grid refresh, NaN where the grid has no report."""
+
+    def __init__(self, factors, version, cg):
+        self.factors = factors
+        self.version = version
+        self.topology_fingerprint = cg.topology_fingerprint
+        self.names = cg.names
+        self._known = np.unique(factors[~np.isnan(factors)])
+
+    def differs_from(self, weather):
+        """True if some node's factor is not weather's, i.e. per-node weather changes any cost."""
+        return bool((self._known != weather_factor(weather)).any())
+
+    def for_graph(self, cg, default):
+        """Factor per node of cg, default where unknown; matched by name if cg's topology differs."""
+        factors = self.factors
+        if cg.topology_fingerprint != self.topology_fingerprint:
+            by_name = dict(zip(self.names, factors.tolist()))
+            factors = np.array([by_name.get(name, np.nan) for name in cg.names])
+        return np.where(np.isnan(factors), default, factors)
+
+
+class WeatherGrid:
+    def __init__(self, precision=GRID_PRECISION):
+        self.precision = precision
+        self.version = 0
+        self.refreshed_at = None
+        self._points = {}
+        self._cells = {}
+        self._node_cells = {}
+        self._node_weather = {}
+        self._lock = threading.Lock()
+
+    def cell(self, lat, lon):
+        return geohash(lat, lon, self.precision)
+
+    def register(self, points):
+        """Add (lat, lon) points to the set refreshed on every pass; NaN points are skipped."""
+        with self._lock:
+            for lat, lon in points:
+                if math.isnan(lat) or math.isnan(lon):
+                    continue
+                self._points.setdefault(self.cell(lat, lon), (lat, lon))
+
+    def refresh(self, provider):
+        """Fetch one weather report per registered cell in a single batch."""
+        with self._lock:
+            cells = list(self._points)
+            points = [self._points[c] for c in cells]
+        reports = provider.fetch_batch(points)
+        fresh = {c: report for c, report in zip(cells, reports) if report}
+        with self._lock:
+            self._cells = fresh
+            self._node_weather = {}
+            self.version += 1
+            self.refreshed_at = time.time()
+
+    def weather_at(self, lat, lon):
+        """Latest report for the cell containing a point, or None before the first refresh."""
+        return self._cells.get(self.cell(lat, lon))
+
+    def node_weather(self, cg):
+        """NodeWeather for cg, built once per refresh and graph; None before the first refresh."""
+        with self._lock:
+            reports = self._cells
+            version = self.version
+            by_graph = self._node_weather
+        if not reports:
+            return None
+        cached = by_graph.get(cg.topology_fingerprint)
+        if cached is not None:
+            return cached
+        cells = self._node_cells.get(cg.topology_fingerprint)
+        if cells is None:
+            coords = cg.coords.tolist()
+            cells = self._node_cells[cg.topology_fingerprint] = [
+                None if math.isnan(lat) else self.cell(lat, lon) for lat, lon in coords
+            ]
+        factors = np.array([
+            weather_factor(reports[cell]["condition"]) if cell in reports else np.nan for cell in cells
+        ])
+        node_weather = by_graph[cg.topology_fingerprint] = NodeWeather(factors, version, cg)
+        return node_weather
+
+
+weather_grid = WeatherGrid()
+
+
+def start_background_refresh(provider, grid=weather_grid, interval=DEFAULT_REFRESH_SECONDS):
+    """Refresh the grid now and then every interval seconds on a daemon thread."""
+    def loop():
+        while True:
+            try:
+                grid.refresh(provider)
+            except Exception as err:
+                print(f"[Weather grid] refresh failed: {err}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="weather-grid", daemon=True)
+    thread.start()
+    return thread
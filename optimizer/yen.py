@@ -0,0 +1,96 @@
+import heapq
+
+from .dijkstra import INF
+
+
+def _spur_search(cg, source, target, weights, banned_nodes, banned_edges):
+    """Dijkstra that skips banned nodes and edge ids; returns (cost, nodes, edges)."""
+    offsets = cg.offsets_list
+    targets = cg.targets_list
+    sources = cg.sources_list
+
+    dist = {source: 0.0}
+    parent_edge = {source: -1}
+    settled = set()
+    queue = [(0.0, source)]
+
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+
+        if node == target:
+            edges = []
+            e = parent_edge[node]
+            while e != -1:
+                edges.append(e)
+                e = parent_edge[sources[e]]
+            edges.reverse()
+            nodes = [source] + [targets[e] for e in edges]
+            return cost, nodes, edges
+
+        for e in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[e]
+            if neighbor in settled or neighbor in banned_nodes or e in banned_edges:
+                continue
+            new_cost = cost + weights[e]
+            if new_cost < dist.get(neighbor, INF):
+                dist[neighbor] = new_cost
+                parent_edge[neighbor] = e
+                heapq.heappush(queue, (new_cost, neighbor))
+
+    return INF, [], []
+
+
+def k_shortest_paths(cg, source, target, weights, k):
+    """
+    Yen's algorithm: the k cheapest loopless routes from source to target.
+
+    Every spur search reads the same per-query weights list, so the edge
+    factors are computed once for all k routes.
+
+    Returns:
+        list: (cost, path as node ids) tuples, cheapest first; fewer than k
+        when the graph has fewer loopless routes
+    """
+    cost, nodes, edges = _spur_search(cg, source, target, weights, set(), set())
+    if not nodes:
+        return []
+
+    found = [(cost, nodes, edges)]
+    candidates = []
+    seen = {tuple(edges)}
+
+    while len(found) < k:
+        _, prev_nodes, prev_edges = found[-1]
+        root_cost = 0.0
+
+        for i in range(len(prev_edges)):
+            spur_node = prev_nodes[i]
+            root_nodes = prev_nodes[:i + 1]
+
+            banned_edges = {
+                path_edges[i]
+                for _, path_nodes, path_edges in found
+                if len(path_edges) > i and path_nodes[:i + 1] == root_nodes
+            }
+            banned_nodes = set(root_nodes[:-1])
+
+            spur_cost, spur_nodes, spur_edges = _spur_search(
+                cg, spur_node, target, weights, banned_nodes, banned_edges
+            )
+            if spur_nodes:
+                total_edges = prev_edges[:i] + spur_edges
+                key = tuple(total_edges)
+                if key not in seen:
+                    seen.add(key)
+                    heapq.heappush(candidates, (root_cost + spur_cost, root_nodes[:-1] + spur_nodes, total_edges))
+
+            root_cost += weights[prev_edges[i]]
+
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates))
+
+    return [(cost, nodes) for cost, nodes, _ in found]